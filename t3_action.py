@@ -9,11 +9,21 @@ class T3Action:
     indexed), and number / move they would like to make.
     T3Actions implement Comparable and are ordered in ascending
     column, row, then move number.
+    
+    Each action also carries a compact integer code (see action_code) whose order
+    is the tiebreaking order, so comparisons and hashing are single integer
+    operations; the actions of a board are interned in its T3Rules. Actions with
+    a field outside the code's range (which no board can play) have no code, and
+    are compared by their fields instead.
     """
     
     _col: int
     _row: int
     _move: int
+    _code: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self._code = action_code(self._col, self._row, self._move)
     
     def col(self) -> int:
         """
@@ -41,6 +51,30 @@ class T3Action:
         """
         return self._move
     
+    def code(self) -> int:
+        """
+        Returns:
+            int:
+                The action's integer code, ordered as the actions themselves, or
+                -1 if the action has none
+        """
+        return self._code
+    
+    @staticmethod
+    def from_code(code: int) -> "T3Action":
+        """
+        Parameters:
+            code (int):
+                A code returned by action_code / T3Action.code
+        
+        Returns:
+            T3Action:
+                A (new, not interned) action with that code
+        """
+        rest, move = divmod(code, _FIELD)
+        col, row = divmod(rest, _FIELD)
+        return T3Action(col, row, move)
+    
     def __str__(self) -> str:
         return "(" + str(self._col) + "," + str(self._row) + ") = " + str(self._move)
     
@@ -48,17 +82,37 @@ class T3Action:
         """
         [!] Ordering for T3Actions that abides by the spec's action tiebreaking rule
         """
-        col_diff = self._col - other._col
-        row_diff = self._row - other._row
-        mov_diff = self._move - other._move
-        if not col_diff == 0: return col_diff < 0
-        if not row_diff == 0: return row_diff < 0
-        return mov_diff < 0
+        if self._code < 0 or other._code < 0:
+            return (self._col, self._row, self._move) < (other._col, other._row, other._move)
+        return self._code < other._code
     
     def __eq__(self, other: Any) -> bool:
         if other is None: return False
         if not isinstance(other, T3Action): return False
-        return self._col == other._col and self._row == other._row and self._move == other._move
+        if self._code < 0 or other._code < 0:
+            return (self._col, self._row, self._move) == (other._col, other._row, other._move)
+        return self._code == other._code
     
     def __hash__(self) -> int:
-        return hash((self._col, self._row, self._move))
+        return self._code if self._code >= 0 else hash((self._col, self._row, self._move))
+
+# Range of each field of an action code
+_FIELD = 256
+
+def action_code(col: int, row: int, move: int) -> int:
+    """
+    Packs an action into an integer, its column, row and move being digits in base
+    _FIELD, so that codes are ordered as the actions' tiebreaking order. Only
+    fields from 0 to _FIELD - 1 (those of any playable board) pack without
+    colliding, so actions with any other field get no code.
+    
+    Parameters:
+        col, row, move (int):
+            The action's column, row and number
+    
+    Returns:
+        int:
+            The action's code, or -1 if a field is out of range
+    """
+    if not (0 <= col < _FIELD and 0 <= row < _FIELD and 0 <= move < _FIELD): return -1
+    return (col * _FIELD + row) * _FIELD + move
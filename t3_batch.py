@@ -0,0 +1,160 @@
+"""
+Vectorized evaluation of many T3 boards at once with NumPy, for self-play data
+generation and analysis: boards are stacked in an (M, N, N) integer array and win /
+tie flags, open tiles and successor boards are computed for all M at once from
+line-sum reductions, instead of one T3State at a time.
+
+[!] Requires numpy, which the rest of the T3 modules do not.
+"""
+from typing import *
+from t3_state import *
+import functools
+import numpy as np
+import numpy.typing as npt
+
+"Valeria Sanz Jones"
+
+Boards = npt.NDArray[np.int8]
+Flags = npt.NDArray[np.bool_]
+
+def to_array(states: Sequence["T3State"]) -> tuple[Boards, Flags]:
+    """
+    Stacks T3States (all of the same size) into a batch.
+    
+    Parameters:
+        states (Sequence[T3State]):
+            The states to convert
+    
+    Returns:
+        tuple[Boards, Flags]:
+            The (M, N, N) int8 boards, and the (M,) odd_turn flags
+    """
+    boards = np.array([state.board() for state in states], dtype=np.int8)
+    odd_turns = np.array([state._odd_turn for state in states], dtype=np.bool_)
+    return (boards, odd_turns)
+
+def from_array(boards: Boards, odd_turns: Flags, rules: Optional["T3Rules"] = None) -> list["T3State"]:
+    """
+    Converts a batch back into T3States.
+    
+    Parameters:
+        boards (Boards):
+            The (M, N, N) boards
+        odd_turns (Flags):
+            The (M,) odd_turn flags
+        rules (Optional[T3Rules]):
+            The states' rules; by default, as in T3State
+    
+    Returns:
+        list[T3State]:
+            One state per board
+    """
+    return [T3State(bool(odd), board.tolist(), rules) for board, odd in zip(boards, odd_turns)]
+
+@functools.lru_cache(maxsize=None)
+def _line_matrix(size: int) -> npt.NDArray[np.float32]:
+    """
+    Returns the (N * N, 2N + 2) 0 / 1 matrix of which lines each row-major cell is
+    on, so that flattened boards times it are their line sums; float32 is exact for
+    these small integers and lets the product run through BLAS.
+    """
+    lines = np.zeros((size * size, 2 * size + 2), dtype=np.float32)
+    for r in range(size):
+        for c in range(size):
+            lines[r * size + c, [r, size + c]] = 1
+            if r == c: lines[r * size + c, 2 * size] = 1
+            if r + c == size - 1: lines[r * size + c, 2 * size + 1] = 1
+    return lines
+
+def _sums(boards: Boards) -> npt.NDArray[np.float32]:
+    n = boards.shape[1]
+    return np.asarray(boards.reshape(len(boards), n * n).astype(np.float32) @ _line_matrix(n))
+
+def line_sums(boards: Boards) -> npt.NDArray[np.int64]:
+    """
+    Parameters:
+        boards (Boards):
+            The (M, N, N) boards
+    
+    Returns:
+        npt.NDArray[np.int64]:
+            The (M, 2N + 2) sums of every line, numbered as T3State's: the rows,
+            then the columns, then the main and anti-diagonal
+    """
+    return _sums(boards).astype(np.int64)
+
+def is_win(boards: Boards, rules: Optional["T3Rules"] = None) -> Flags:
+    """
+    Parameters:
+        boards (Boards):
+            The (M, N, N) boards
+        rules (Optional[T3Rules]):
+            The boards' rules; by default, as in T3State
+    
+    Returns:
+        Flags:
+            Whether each board has a line summing to WIN_TARGET (T3State.is_win)
+    """
+    target = rules.win_target if rules is not None else T3State.WIN_TARGET
+    return np.asarray((_sums(boards) == target).any(axis=1))
+
+def open_mask(boards: Boards) -> Flags:
+    """
+    Parameters:
+        boards (Boards):
+            The (M, N, N) boards
+    
+    Returns:
+        Flags:
+            The (M, N, N) mask of open (0) tiles
+    """
+    return np.asarray(boards == 0)
+
+def is_tie(boards: Boards, rules: Optional["T3Rules"] = None) -> Flags:
+    """
+    Parameters:
+        boards (Boards):
+            The (M, N, N) boards
+        rules (Optional[T3Rules]):
+            The boards' rules; by default, as in T3State
+    
+    Returns:
+        Flags:
+            Whether each board is full without a win (T3State.is_tie)
+    """
+    return np.asarray(~is_win(boards, rules) & ~open_mask(boards).any(axis=(1, 2)))
+
+def successors(boards: Boards, odd_turns: Flags,
+               rules: Optional["T3Rules"] = None) -> tuple[Boards, Flags, npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    Generates every legal successor of every board, in T3State.get_transitions
+    order: by board, then column, row and move number. Terminal boards are not
+    skipped, so mask them out first (with is_win / is_tie) if they should be.
+    
+    Parameters:
+        boards (Boards):
+            The (M, N, N) boards
+        odd_turns (Flags):
+            The (M,) odd_turn flags
+        rules (Optional[T3Rules]):
+            The boards' rules; by default, as in T3State
+    
+    Returns:
+        tuple[Boards, Flags, NDArray, NDArray]:
+            The (K, N, N) successor boards and their (K,) odd_turn flags, the (K,)
+            index of each one's parent board, and the (K, 3) (col, row, move) of
+            the action leading to it
+    """
+    max_move = rules.max_move if rules is not None else T3State.MAX_MOVE
+    if max_move % 2: raise ValueError("[X] Batches need both players to have as many moves (an even max_move)")
+    per_tile = max_move // 2
+    parent, col, row = np.nonzero(open_mask(boards).transpose(0, 2, 1))
+    parent = np.repeat(parent, per_tile)
+    col = np.repeat(col, per_tile)
+    row = np.repeat(row, per_tile)
+    first = np.where(odd_turns[parent], 1, 2)
+    move = first + 2 * np.tile(np.arange(per_tile), len(parent) // per_tile if per_tile else 0)
+    children = boards[parent].copy()
+    children[np.arange(len(parent)), row, col] = move
+    actions = np.stack([col, row, move], axis=1).astype(np.int64)
+    return (children, ~odd_turns[parent], parent.astype(np.int64), actions)
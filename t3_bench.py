@@ -0,0 +1,222 @@
+"""
+Benchmark suite for the T3Player and T3State primitives: times a fixed corpus of
+positions, reports nodes per second and peak memory, and compares the results
+against a saved baseline to catch performance regressions.
+
+Usage:
+    python t3_bench.py [--json OUT.json] [--baseline BASE.json] [--tolerance 0.25]
+                       [--repeat 3] [--only NAME ...]
+"""
+from dataclasses import *
+from typing import *
+from t3_player import *
+import argparse
+import json
+import sys
+import t3_player
+import time
+import tracemalloc
+
+"Valeria Sanz Jones"
+
+@dataclass
+class BenchCase:
+    """
+    One benchmark of the corpus: a position and what to measure on it.
+    
+    Kinds:
+        "choose":      an exhaustive choose(state) with a fresh transposition table
+                       and move ordering
+        "depth":       a fixed-depth alphabeta (for boards too big to solve), likewise
+        "transitions": listing every (action, state) transition, ops times
+        "next_state":  get_next_state of every legal action, ops times
+        "is_win":      is_win and is_tie of the state, ops times
+    """
+    
+    name: str
+    kind: str
+    odd_turn: bool
+    board: list[list[int]]
+    # Search depth of "depth" cases, repetitions of the primitive cases
+    depth: int = 0
+    ops: int = 1
+
+@dataclass
+class BenchResult:
+    """
+    The measurements of one BenchCase.
+    """
+    
+    name: str
+    seconds: float
+    nodes: int
+    nodes_per_second: float
+    peak_bytes: int
+    
+    def to_json(self) -> dict[str, Any]:
+        return asdict(self)
+
+def _empty(size: int) -> list[list[int]]:
+    return [[0] * size for _ in range(size)]
+
+# The fixed corpus; names are the keys results are compared by, so never reuse one
+# for a different position
+CORPUS: list[BenchCase] = [
+    BenchCase("empty3_odds", "choose", True, _empty(3)),
+    BenchCase("empty3_evens", "choose", False, _empty(3)),
+    BenchCase("center5", "choose", False, [[0, 0, 0], [0, 5, 0], [0, 0, 0]]),
+    BenchCase("mid_edges", "choose", True, [[0, 1, 0], [2, 0, 0], [0, 0, 0]]),
+    BenchCase("mid_diagonal", "choose", False, [[3, 0, 0], [0, 4, 0], [0, 0, 1]]),
+    BenchCase("mid_corner_edge", "choose", True, [[1, 0, 0], [0, 0, 0], [0, 2, 0]]),
+    BenchCase("tactical_double_threat", "choose", False, [[6, 4, 0], [0, 0, 0], [2, 0, 0]]),
+    BenchCase("tactical_block", "choose", True, [[4, 0, 3], [0, 0, 0], [0, 0, 0]]),
+    BenchCase("open4_empty", "depth", True, _empty(4), depth=3),
+    BenchCase("open4_center", "depth", False, [[0, 0, 0, 0], [0, 5, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]], depth=3),
+    BenchCase("open4_corners", "depth", True, [[2, 0, 0, 1], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]], depth=3),
+    BenchCase("prim_transitions3", "transitions", True, [[0, 1, 0], [0, 0, 0], [2, 0, 6]], ops=2000),
+    BenchCase("prim_transitions4", "transitions", True, _empty(4), ops=200),
+    BenchCase("prim_next_state3", "next_state", True, [[0, 1, 0], [0, 0, 0], [2, 0, 6]], ops=2000),
+    BenchCase("prim_is_win4", "is_win", False, [[6, 5, 0, 0], [6, 6, 0, 3], [4, 1, 5, 1], [0, 0, 0, 0]], ops=50000),
+]
+
+def _measure(case: BenchCase) -> int:
+    """
+    Performs a case's work once.
+    
+    Returns:
+        int:
+            The number of search nodes visited (0 for primitive cases)
+    """
+    state = T3State(case.odd_turn, [list(row) for row in case.board])
+    if case.kind == "choose":
+        stats = SearchStats()
+        choose(state, TranspositionTable(), stats=stats, ordering=MoveOrdering())
+        return stats.nodes
+    if case.kind == "depth":
+        stats = SearchStats(root_open=state._open)
+        alphabeta(state, float("-inf"), float("inf"), not state._odd_turn, TranspositionTable(), case.depth, None, stats,
+                  None, MoveOrdering())
+        return stats.nodes
+    for _ in range(case.ops):
+        if case.kind == "transitions":
+            for _ in state.get_transitions(): pass
+        elif case.kind == "next_state":
+            for act in state.get_actions(): state.get_next_state(act)
+        elif case.kind == "is_win":
+            state.is_win()
+            state.is_tie()
+        else:
+            raise ValueError("[X] Unknown benchmark kind " + case.kind)
+    return 0
+
+def run_case(case: BenchCase, repeat: int = 3) -> BenchResult:
+    """
+    Benchmarks one case: the best wall time of repeat runs, then one more run
+    under tracemalloc (kept out of the timings) for the peak memory.
+    
+    Parameters:
+        case (BenchCase):
+            The case to run
+        repeat (int):
+            How many timed runs to take the best of
+    
+    Returns:
+        BenchResult:
+            The case's measurements
+    """
+    best, nodes = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        nodes = _measure(case)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        _measure(case)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchResult(case.name, best, nodes, nodes / best if best else 0.0, peak)
+
+def run(cases: Optional[list[BenchCase]] = None, repeat: int = 3) -> list[BenchResult]:
+    """
+    Runs the given cases (the whole CORPUS by default) with the tablebase and
+    opening book disabled, so that the search itself is what gets measured.
+    
+    Parameters:
+        cases (Optional[list[BenchCase]]):
+            The cases to run
+        repeat (int):
+            How many timed runs to take the best of, per case
+    
+    Returns:
+        list[BenchResult]:
+            The results, in case order
+    """
+    saved = (t3_player.TABLEBASE_PATH, t3_player.BOOK_PATH)
+    t3_player.TABLEBASE_PATH = t3_player.BOOK_PATH = None
+    try:
+        return [run_case(case, repeat) for case in (CORPUS if cases is None else cases)]
+    finally:
+        t3_player.TABLEBASE_PATH, t3_player.BOOK_PATH = saved
+
+def compare(results: list[BenchResult], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Finds the regressions of results against a baseline written by --json: cases
+    that got slower, or that visit more nodes, by more than the tolerance.
+    
+    Parameters:
+        results (list[BenchResult]):
+            The fresh results
+        baseline (dict[str, Any]):
+            The parsed baseline file
+        tolerance (float):
+            The allowed relative increase, e.g., 0.25 for 25%
+    
+    Returns:
+        list[str]:
+            One message per regression (empty if none)
+    """
+    before = {entry["name"]: entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = before.get(result.name)
+        if old is None: continue
+        if result.seconds > old["seconds"] * (1 + tolerance):
+            regressions.append(result.name + ": " + format(old["seconds"], ".4f") + "s -> " +
+                               format(result.seconds, ".4f") + "s")
+        if result.nodes > old["nodes"] * (1 + tolerance):
+            regressions.append(result.name + ": " + str(old["nodes"]) + " -> " + str(result.nodes) + " nodes")
+    return regressions
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Command line entry point; returns the process exit status (1 on regressions).
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the T3 player and state primitives.")
+    parser.add_argument("--json", help="write machine-readable results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (default 3)")
+    parser.add_argument("--only", nargs="*", help="names of the cases to run")
+    args = parser.parse_args(argv)
+    
+    cases = [case for case in CORPUS if not args.only or case.name in args.only]
+    results = run(cases, args.repeat)
+    print("%-24s %10s %10s %12s %12s" % ("case", "seconds", "nodes", "nodes/s", "peak KiB"))
+    for result in results:
+        print("%-24s %10.4f %10d %12.0f %12.1f" % (result.name, result.seconds, result.nodes,
+                                                  result.nodes_per_second, result.peak_bytes / 1024))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": [r.to_json() for r in results]}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print("[X] Regression: " + message)
+        if regressions: return 1
+        print("[!] No regressions against " + args.baseline)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Streaming blunder analysis of recorded T3 games: reads games from a JSONL file one
+chunk at a time, evaluates every distinct position exactly across a process pool,
+and appends one report line per game, checkpointing as it goes so an interrupted
+run can be resumed where it stopped.
+
+Input lines are JSON objects (or bare move lists):
+    {"id": "g1", "board": [[...]], "odds_starts": true, "moves": [[col, row, move], ...]}
+where "id", "board" (an empty 3x3 board by default) and "odds_starts" (true by
+default) are optional. Output lines are:
+    {"game": ID, "plies": N, "result": "odd"|"even"|"tie"|null,
+     "blunders": [{"ply": P, "move": [c, r, m], "utility": U, "best": B}, ...]}
+where a blunder is a move whose utility to its player (as in analyze) is below the
+best utility available to them, and "error" replaces the rest for invalid games.
+
+Usage:
+    python t3_blunders.py GAMES.jsonl REPORT.jsonl [--workers 4] [--chunk 1000]
+                          [--cache 100000] [--restart]
+"""
+from collections import OrderedDict
+from dataclasses import *
+from typing import *
+from t3_player import *
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+"Valeria Sanz Jones"
+
+# Transposition table entries a worker keeps before starting over, bounding its memory
+MAX_TABLE = 2_000_000
+
+Key = tuple[tuple[int, ...], bool]
+
+@dataclass
+class Game:
+    """
+    One recorded game, as read from a line of the input.
+    """
+    
+    id: Any
+    board: Optional[list[list[int]]]
+    odds_starts: bool
+    moves: list[list[int]]
+
+def read_games(path: str, skip: int = 0) -> Iterator[tuple[int, Optional[Game]]]:
+    """
+    Lazily reads the games of a JSONL file.
+    
+    Parameters:
+        path (str):
+            The input file
+        skip (int):
+            How many lines to skip first (those already analyzed)
+    
+    Yields:
+        tuple[int, Optional[Game]]:
+            The line number (from 0) and its game, or None for lines that do not
+            parse as one; blank lines are skipped
+    """
+    with open(path) as f:
+        for number, line in enumerate(f):
+            if number < skip or not line.strip(): continue
+            try:
+                raw = json.loads(line)
+                if isinstance(raw, list): raw = {"moves": raw}
+                yield (number, Game(raw.get("id", number), raw.get("board"), bool(raw.get("odds_starts", True)),
+                                    [list(move) for move in raw["moves"]]))
+            except (ValueError, TypeError, KeyError, AttributeError):
+                yield (number, None)
+
+def _replay(game: Game) -> list["T3State"]:
+    """
+    Returns:
+        list[T3State]:
+            The positions of a game, from its start to after its last move
+    
+    [!] Raises a ValueError for a malformed board (see T3State), or at the first
+    illegal move
+    """
+    state = T3State(game.odds_starts, game.board)
+    positions = [state]
+    for move in game.moves:
+        act = T3Action(*move)
+        if state.is_win() or state.is_tie() or not state.is_valid_action(act):
+            raise ValueError("illegal move " + str(move) + " at ply " + str(len(positions) - 1))
+        state = state.get_next_state(act)
+        positions.append(state)
+    return positions
+
+# Each worker's table, persisting across its tasks
+_table = TranspositionTable()
+
+def _evaluate(positions: list[tuple[list[list[int]], bool]]) -> list[float]:
+    """
+    Worker task: the exact minimax values (evens maximizing) of a batch of
+    non-terminal positions, given as (board, odd_turn).
+    """
+    if len(_table) > MAX_TABLE: _table.clear()
+    values = []
+    for board, odd_turn in positions:
+        state = T3State(odd_turn, board)
+        values.append(alphabeta(state, float("-inf"), float("inf"), not odd_turn, _table))
+    return values
+
+def _value(state: "T3State", cache: "OrderedDict[Key, float]") -> float:
+    """
+    The minimax value of a position, from the cache unless it is terminal.
+    """
+    if state.is_tie(): return 0.0
+    if state.is_win(): return float(state._open + 1) * (1 if state._odd_turn else -1)
+    key = state.canonical_key()
+    cache.move_to_end(key)
+    return cache[key]
+
+def _report(game: Game, positions: list["T3State"], cache: "OrderedDict[Key, float]") -> dict[str, Any]:
+    """
+    Builds a game's report line from the values of its positions.
+    """
+    blunders = []
+    for ply, move in enumerate(game.moves):
+        before, after = positions[ply], positions[ply + 1]
+        sign = -1 if before._odd_turn else 1
+        best, played = sign * _value(before, cache), sign * _value(after, cache)
+        if played < best:
+            blunders.append({"ply": ply, "move": move, "utility": int(played), "best": int(best)})
+    end = positions[-1]
+    result = ("even" if end._odd_turn else "odd") if end.is_win() else "tie" if end.is_tie() else None
+    return {"game": game.id, "plies": len(game.moves), "result": result, "blunders": blunders}
+
+def analyze_games(source: str, out: str, workers: Optional[int] = None, chunk: int = 1000,
+                  cache_size: int = 100_000, restart: bool = False) -> int:
+    """
+    Runs the pipeline: games are read a chunk at a time, the distinct positions of
+    the chunk (by canonical_key) that are not in the evaluation cache are split
+    among the workers, and the chunk's reports are appended to out, after which
+    a checkpoint records how far the input and output got. Memory is bounded by
+    the chunk, the cache (least recently used positions are evicted) and the
+    workers' tables, whatever the input size.
+    
+    Parameters:
+        source (str):
+            The JSONL file of games
+        out (str):
+            The JSONL report to write; its checkpoint is out + ".ckpt"
+        workers (Optional[int]):
+            Number of worker processes; defaults to the number of CPUs, and 1
+            evaluates in this process
+        chunk (int):
+            Games per chunk
+        cache_size (int):
+            Position values kept between chunks
+        restart (bool):
+            Whether to ignore an existing checkpoint and start over
+    
+    Returns:
+        int:
+            The number of games reported by this run
+    """
+    checkpoint = out + ".ckpt"
+    lines, offset = 0, 0
+    if not restart and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            saved = json.load(f)
+        lines, offset = saved["lines"], saved["offset"]
+        if not os.path.exists(out): lines, offset = 0, 0
+    workers = workers or os.cpu_count() or 1
+    pool = concurrent.futures.ProcessPoolExecutor(workers) if workers > 1 else None
+    cache: "OrderedDict[Key, float]" = OrderedDict()
+    reported = 0
+    games = read_games(source, lines)
+    try:
+        with open(out, "r+" if offset else "w") as report:
+            # Drop whatever was written after the last checkpoint
+            report.truncate(offset)
+            report.seek(offset)
+            while True:
+                batch = [item for _, item in zip(range(chunk), games)]
+                if not batch: break
+                replayed: list[tuple[Optional[Game], Union[list["T3State"], str]]] = []
+                pending: dict[Key, "T3State"] = {}
+                for _, game in batch:
+                    if game is None:
+                        replayed.append((None, "unreadable line"))
+                        continue
+                    try:
+                        positions = _replay(game)
+                    except (ValueError, TypeError, IndexError) as e:
+                        replayed.append((game, str(e)))
+                        continue
+                    replayed.append((game, positions))
+                    for state in positions:
+                        if state.is_win() or state.is_tie(): continue
+                        key = state.canonical_key()
+                        if key in cache: cache.move_to_end(key)
+                        else: pending.setdefault(key, state)
+                tasks = [(state.board(), state._odd_turn) for state in pending.values()]
+                if pool is None:
+                    values = _evaluate(tasks)
+                else:
+                    size = max(1, len(tasks) // (4 * workers))
+                    parts = pool.map(_evaluate, [tasks[i:i + size] for i in range(0, len(tasks), size)])
+                    values = [value for part in parts for value in part]
+                cache.update(zip(pending, values))
+                for (number, _), (game, replay) in zip(batch, replayed):
+                    if isinstance(replay, str):
+                        line = {"game": game.id if game is not None else number, "error": replay}
+                    else:
+                        line = _report(cast(Game, game), replay, cache)
+                    report.write(json.dumps(line, separators=(",", ":")) + "\n")
+                while len(cache) > cache_size: cache.popitem(last=False)
+                report.flush()
+                lines = batch[-1][0] + 1
+                reported += len(batch)
+                with open(checkpoint, "w") as f:
+                    json.dump({"lines": lines, "offset": report.tell()}, f)
+    finally:
+        if pool is not None: pool.shutdown()
+    return reported
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report the blunders of recorded T3 games.")
+    parser.add_argument("games", help="JSONL file of games")
+    parser.add_argument("report", help="JSONL report to write (resumed if its checkpoint exists)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPUs; 1 runs inline)")
+    parser.add_argument("--chunk", type=int, default=1000, help="games per chunk (default 1000)")
+    parser.add_argument("--cache", type=int, default=100_000, help="position values cached (default 100000)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+    count = analyze_games(args.games, args.report, args.workers, args.chunk, args.cache, args.restart)
+    print("[!] Reported " + str(count) + " games to " + args.report, file=sys.stderr)
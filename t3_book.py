@@ -0,0 +1,211 @@
+"""
+Opening book for T3: an offline generator that searches every position of the
+first few plies from a start board, and a reader that the T3Player loads lazily to
+answer those positions without searching. Meant for boards too big for the 3x3
+tablebase, where the opening search is the most expensive one of the game.
+"""
+from typing import *
+from t3_state import *
+import argparse
+import os
+import struct
+import sys
+import t3_tablebase
+import time
+
+if TYPE_CHECKING:
+    import t3_player
+
+"Valeria Sanz Jones"
+
+# Where the T3Player looks for the opening book unless told otherwise
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "t3_book.bin")
+# Version of the on-disk format, bumped whenever the layout or encoding changes
+VERSION = 1
+
+# File header: magic, format version, board size, MAX_MOVE, WIN_TARGET, plies
+# covered, search depth (0 for exhaustive searches), entry count
+_HEADER = struct.Struct("<4sBBBBBBI")
+_MAGIC = b"T3OB"
+
+Key = tuple[tuple[int, ...], bool]
+
+class OpeningBook:
+    """
+    An opening book read from disk. Each entry maps a canonical_key to the set of
+    the position's best actions in the canonical frame, so that the answer of any
+    rotation / reflection of it can be found under choose's tiebreaking order.
+    Books searched to the end (exact) give choose's own answers; depth-limited
+    ones give those of a deeper search than a deadline usually allows.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Reads and validates the book at the given path.
+        
+        Parameters:
+            path (str):
+                The file written by generate
+        
+        [!] Raises a ValueError if the file is not an opening book of this VERSION
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, size, max_move, win_target, plies, depth, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != VERSION:
+            raise ValueError("[X] " + path + " is not a version " + str(VERSION) + " T3 opening book")
+        self._size: int = size
+        self._max_move: int = max_move
+        self._win_target: int = win_target
+        self.plies: int = plies
+        self.depth: int = depth
+        self._entries: dict[Key, bytes] = {}
+        cells, offset = size * size, _HEADER.size
+        for _ in range(count):
+            board = tuple(data[offset:offset + cells])
+            odd_turn, moves = bool(data[offset + cells]), data[offset + cells + 1]
+            offset += cells + 2
+            self._entries[(board, odd_turn)] = data[offset:offset + moves]
+            offset += moves
+    
+    def exact(self) -> bool:
+        """
+        Returns:
+            bool:
+                Whether the book's answers are those of exhaustive searches
+        """
+        return self.depth == 0
+    
+    def lookup(self, state: "T3State") -> Optional["T3Action"]:
+        """
+        Returns the book's best action for the given state, if the book was
+        generated for the current rules and covers it.
+        
+        Parameters:
+            state (T3State):
+                The (non-terminal) state a move is wanted for
+        
+        Returns:
+            Optional[T3Action]:
+                The best action, or None if the state is not in the book
+        """
+        if state._rules.key() != (self._size, self._max_move, self._win_target): return None
+        key = state.canonical_key()
+        codes = self._entries.get(key)
+        if codes is None: return None
+        # The best set is closed under the position's own symmetries, so mapping it
+        # back through any orientation that yields the key gives the same set
+        flat = state._cells
+        perm = next(perm for perm in state._rules.symmetries if tuple([flat[i] for i in perm]) == key[0])
+        best = [t3_tablebase.decode(code, self._size, self._max_move) for code in codes]
+        return min(T3Action(perm[a.row() * self._size + a.col()] % self._size,
+                            perm[a.row() * self._size + a.col()] // self._size, a.move()) for a in best)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def best_actions(state: "T3State", table: "t3_player.TranspositionTable", depth: Optional[int] = None) -> list["T3Action"]:
+    """
+    Finds every action of a position that choose could answer with, were it not
+    for its last (T3Action order) tiebreak: those of best value for an exhaustive
+    search, or of best score for a deepen iteration of the given depth. (The moves
+    choose never searches all lose at once, so are only ever best when every move
+    is, which is also when choose falls back to the earliest one.)
+    
+    Parameters:
+        state (T3State):
+            A non-terminal state without an immediate win for the player to move
+        table (TranspositionTable):
+            The transposition table to search with
+        depth (Optional[int]):
+            Plies to search, or None to search to the end
+    
+    Returns:
+        list[T3Action]:
+            The best actions, in T3Action order
+    """
+    # Imported here, as t3_player itself loads books from this module
+    import t3_player
+    root = state.copy()
+    sign = -1 if state._odd_turn else 1
+    actions = list(state.get_actions())
+    scores: dict["T3Action", float] = {}
+    for act in actions:
+        root.apply(act)
+        scores[act] = sign * t3_player.alphabeta(root, float("-inf"), float("inf"), not root._odd_turn, table,
+                                                 None if depth is None else depth - 1)
+        root.undo(act)
+    best = max(scores.values())
+    return [act for act in actions if scores[act] == best]
+
+def generate(path: str, roots: list["T3State"], plies: int, depth: Optional[int] = None,
+             verbose: bool = False) -> int:
+    """
+    Searches every non-terminal position fewer than plies moves from the roots
+    (merging rotations / reflections into their canonical_key) and writes the book.
+    Positions with an immediate win are left out, as choose plays those first.
+    
+    Parameters:
+        path (str):
+            Where to write the book
+        roots (list[T3State]):
+            The start positions, all of the same size
+        plies (int):
+            How many plies from the roots to cover
+        depth (Optional[int]):
+            Plies each position is searched to, or None to search to the end
+            (only feasible for small boards or late starts)
+        verbose (bool):
+            Whether to print progress to stderr
+    
+    Returns:
+        int:
+            The number of positions written
+    
+    [!] Raises a ValueError for a depth below 1, which the header could not tell
+    from an exhaustive search
+    """
+    import t3_player
+    if depth is not None and depth < 1:
+        raise ValueError("[X] Search depth " + str(depth) + " is not positive")
+    rules = roots[0]._rules
+    size, max_move = rules.size, rules.max_move
+    if size * size * max_move > 0xFF:
+        raise ValueError("[X] Board of size " + str(size) + " does not fit one-byte actions")
+    start = time.monotonic()
+    table = t3_player.TranspositionTable()
+    layer = {root.canonical_key() for root in roots if not root.is_win() and not root.is_tie()}
+    records = []
+    for ply in range(plies):
+        next_layer: set[Key] = set()
+        for key in sorted(layer):
+            cells, odd_turn = key
+            state = T3State(odd_turn, [list(cells[r * size:(r + 1) * size]) for r in range(size)], rules)
+            if not state.get_threats():
+                codes = bytes([t3_tablebase.encode(act, size, max_move) for act in best_actions(state, table, depth)])
+                records.append(bytes(key[0]) + bytes([key[1], len(codes)]) + codes)
+            if ply + 1 < plies:
+                for act in state.get_actions():
+                    state.apply(act)
+                    if not state.is_win() and not state.is_tie(): next_layer.add(state.canonical_key())
+                    state.undo(act)
+        if verbose:
+            print("[...] ply " + str(ply) + ": " + str(len(layer)) + " positions (" +
+                  str(round(time.monotonic() - start)) + "s)", file=sys.stderr)
+        layer = next_layer
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, VERSION, size, max_move, rules.win_target, plies, depth or 0, len(records)))
+        for record in records: f.write(record)
+    return len(records)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a T3 opening book.")
+    parser.add_argument("--size", type=int, default=4, help="side length of the empty start board (default 4)")
+    parser.add_argument("--plies", type=int, default=2, help="plies from the start to cover (default 2)")
+    parser.add_argument("--depth", type=int, help="search depth per position (default: to the end)")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="where to write the book")
+    args = parser.parse_args()
+    if args.depth is not None and args.depth < 1: parser.error("--depth must be at least 1")
+    empty = [[0] * args.size for _ in range(args.size)]
+    count = generate(args.out, [T3State(True, empty), T3State(False, empty)], args.plies, args.depth, verbose=True)
+    print("[!] Wrote " + str(count) + " positions to " + args.out)
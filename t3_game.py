@@ -1,6 +1,8 @@
 from t3_state import *
 from t3_action import *
 from t3_player import *
+from t3_mcts import *
+import time
 import unittest
 import pytest
 
@@ -18,6 +20,20 @@ START_STATE = [
 ODDS_STARTS = True
 # Whether or not the human player plays as odds
 PLAYER_ODDS = True
+# Seconds the AI may think per move, or None to search the whole game tree (set
+# this for boards larger than 3x3, where a full search can take very long)
+THINK_TIME: Optional[float] = None
+# Whether or not to print how much searching the AI did for each of its moves
+SHOW_STATS = False
+# Whether or not the AI plays by Monte Carlo Tree Search (suited to large boards,
+# and bounded by THINK_TIME if set) instead of alpha-beta search
+USE_MCTS = False
+# Whether or not the AI searches the player's possible moves while they type theirs
+# (alpha-beta only), so that its reply is often ready as soon as they have moved
+PONDER = True
+# Bytes the AI's search cache may take, or None to let it grow with the search (set
+# this for boards larger than 3x3, where the cache can otherwise exhaust memory)
+TABLE_BYTES: Optional[int] = None
 
 if __name__ == '__main__':
     """
@@ -30,7 +46,11 @@ if __name__ == '__main__':
     print("================================")
     
     state = T3State(ODDS_STARTS, START_STATE)
+    new_game()
+    GAME_TREE.reset()
+    table = BoundedTable(TABLE_BYTES) if TABLE_BYTES is not None else GAME_TABLE
     players_turn = not (ODDS_STARTS ^ PLAYER_ODDS)
+    ponderer = Ponderer(table) if PONDER and not USE_MCTS else None
     act = None
     
     # Main game loop: keep placing tiles until a terminal
@@ -40,6 +60,7 @@ if __name__ == '__main__':
         if players_turn:
             print("Enter three space-separated numbers in format: COL ROW NUMBER ")
             print("[Player's Turn] - Move Options: " + str(state.get_moves()) + " > ")
+            if ponderer is not None: ponderer.start(state)
             choice = input()
             parsed_act = choice.split(" ")
             err = "[X] Invalid or improperly formatted action, l2p. Try again."
@@ -55,12 +76,22 @@ if __name__ == '__main__':
         # Agent's turn
         else:
             print("\n[...] AI is thinking...")
-            act = choose(state)
+            stats = SearchStats() if SHOW_STATS and not USE_MCTS else None
+            deadline = time.monotonic() + THINK_TIME if THINK_TIME is not None else None
+            act = ponderer.answer(state) if ponderer is not None else None
+            if USE_MCTS:
+                act = choose_mcts(state, deadline=deadline)
+            elif act is None:
+                act = choose(state, table, deadline, stats)
+            else:
+                stats = None
             print("[Opponent's Turn] > " + str(act))
+            if stats is not None: print("[Stats] " + stats.report())
         
         state = state.get_next_state(act)
         players_turn = not players_turn
     
+    if ponderer is not None: ponderer.stop()
     print("\n********************************")
     print(("[L] You got dunked on!" if players_turn else "[W] You are the T3 elite!") if state.is_win() else "[T] Tie game!")
     print(state)
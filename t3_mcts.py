@@ -0,0 +1,235 @@
+"""
+Monte Carlo Tree Search engine for T3, an alternative to the exhaustive alpha-beta
+T3Player for large boards: UCT selection over a tree grown one node per iteration,
+random rollouts to a terminal, and reuse of the tree between consecutive turns.
+"""
+from typing import *
+from t3_state import *
+import math
+import random
+import time
+
+"Valeria Sanz Jones"
+
+# Default UCT exploration constant (the UCB1 sqrt(2))
+EXPLORATION = math.sqrt(2)
+# Iterations run by choose_mcts when neither iterations nor deadline is given
+DEFAULT_ITERATIONS = 1000
+
+class MCTSNode:
+    """
+    A node of the search tree: the state reached by playing action from the parent's
+    state, with the rollout statistics of the player who played it.
+    """
+    
+    __slots__ = ("action", "parent", "children", "untried", "visits", "reward", "odd_mover")
+    
+    def __init__(self, action: Optional["T3Action"], parent: Optional["MCTSNode"], odd_mover: bool):
+        """
+        Parameters:
+            action (Optional[T3Action]):
+                The action leading to this node (None at the root)
+            parent (Optional[MCTSNode]):
+                The node the action was played from (None at the root)
+            odd_mover (bool):
+                Whether the odd player made the action
+        """
+        self.action = action
+        self.parent = parent
+        self.children: list["MCTSNode"] = []
+        # Actions not yet expanded into children; None until the node is expanded
+        self.untried: Optional[list["T3Action"]] = None
+        self.visits: int = 0
+        # Sum of rollout results for the player who made the action (win 1, tie 0.5)
+        self.reward: float = 0.0
+        self.odd_mover = odd_mover
+    
+    def select(self, exploration: float) -> "MCTSNode":
+        """
+        Returns:
+            MCTSNode:
+                The child maximizing the UCT (UCB1) score
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.reward / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+class MCTSTree:
+    """
+    A reusable MCTS search. Between calls to choose, the tree is kept, and if the
+    next state is the current root or is reached from it within two moves (e.g.,
+    this player's move and the opponent's reply), that subtree becomes the new
+    root along with all its statistics.
+    """
+    
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Parameters:
+            seed (Optional[int]):
+                Seed of the rollout randomness, for reproducible choices
+        """
+        self._rng = random.Random(seed)
+        self._root: Optional[MCTSNode] = None
+        self._root_state: Optional["T3State"] = None
+    
+    def reset(self) -> None:
+        """
+        Drops the tree; call at the start of each game.
+        """
+        self._root = None
+        self._root_state = None
+    
+    def root_visits(self) -> int:
+        """
+        Returns:
+            int:
+                The number of rollouts through the current root (0 if none)
+        """
+        return self._root.visits if self._root is not None else 0
+    
+    def choose(self, state: "T3State", iterations: Optional[int] = None, deadline: Optional[float] = None,
+               exploration: float = EXPLORATION) -> Optional["T3Action"]:
+        """
+        Runs MCTS from the given state and returns its most visited move, or an
+        immediately winning move if there is one.
+        
+        Parameters:
+            state (T3State):
+                The state to choose a move from
+            iterations (Optional[int]):
+                The number of iterations to run (DEFAULT_ITERATIONS if neither
+                this nor deadline is given)
+            deadline (Optional[float]):
+                The time.monotonic() after which to stop iterating
+            exploration (float):
+                The UCT exploration constant
+        
+        Returns:
+            Optional[T3Action]:
+                None for terminal states, else the chosen action
+        """
+        if state.is_win() or state.is_tie(): return None
+        wins = state.get_threats()
+        if wins: return wins[0]
+        if iterations is None and deadline is None: iterations = DEFAULT_ITERATIONS
+        root = self._reroot(state)
+        done = 0
+        while (iterations is None or done < iterations) and (deadline is None or time.monotonic() < deadline):
+            self._iterate(root, state.copy(), exploration)
+            done += 1
+        if not root.children: return next(iter(state.get_actions()))
+        best = min(root.children, key=lambda child: (-child.visits, _order(child)))
+        return best.action
+    
+    def _reroot(self, state: "T3State") -> MCTSNode:
+        """
+        Finds the node of the kept tree for the given state (at most two plies below
+        the old root) and makes it the root, or starts a new tree.
+        """
+        if self._root is not None and self._root_state is not None:
+            if self._root_state == state: return self._root
+            frontier = [(self._root, self._root_state)]
+            for _ in range(2):
+                next_frontier = []
+                for node, node_state in frontier:
+                    for child in node.children:
+                        child_state = node_state.get_next_state(child.action)
+                        if child_state == state:
+                            child.parent = None
+                            self._root, self._root_state = child, state.copy()
+                            return child
+                        next_frontier.append((child, child_state))
+                frontier = next_frontier
+        self._root = MCTSNode(None, None, not state._odd_turn)
+        self._root_state = state.copy()
+        return self._root
+    
+    def _iterate(self, root: MCTSNode, state: "T3State", exploration: float) -> None:
+        """
+        One MCTS iteration: select down the tree, expand one new child, play a
+        random rollout from it and back its result up the path.
+        
+        Parameters:
+            root (MCTSNode):
+                The root of the search
+            state (T3State):
+                A scratch copy of the root's state, which is played forward
+            exploration (float):
+                The UCT exploration constant
+        """
+        node = root
+        while node.untried is not None and not node.untried and node.children:
+            node = node.select(exploration)
+            state.apply(cast(T3Action, node.action))
+        if not state.is_win() and not state.is_tie():
+            if node.untried is None: node.untried = list(state.get_actions())
+            act = node.untried.pop(self._rng.randrange(len(node.untried)))
+            child = MCTSNode(act, node, state._odd_turn)
+            node.children.append(child)
+            state.apply(act)
+            node = child
+        winner = self._rollout(state)
+        walk: Optional[MCTSNode] = node
+        while walk is not None:
+            walk.visits += 1
+            if winner is None: walk.reward += 0.5
+            elif winner == walk.odd_mover: walk.reward += 1.0
+            walk = walk.parent
+    
+    def _rollout(self, state: "T3State") -> Optional[bool]:
+        """
+        Plays random moves (but always an immediate win when one is available) until
+        the game ends.
+        
+        Parameters:
+            state (T3State):
+                The state to play out, modified in place
+        
+        Returns:
+            Optional[bool]:
+                Whether the odd player won (True) or the even player (False); None
+                for a tie
+        """
+        rng = self._rng
+        while True:
+            if state.is_win(): return not state._odd_turn
+            if state.is_tie(): return None
+            wins = state.get_threats()
+            if wins:
+                state.apply(wins[0])
+                continue
+            col, row = rng.choice(state.get_open_tiles())
+            state.apply(T3Action(col, row, rng.choice(state.get_moves())))
+
+def _order(node: MCTSNode) -> tuple[int, int, int]:
+    """
+    The T3Action ordering key of a node's action, used to break visit-count ties.
+    """
+    act = cast(T3Action, node.action)
+    return (act._col, act._row, act._move)
+
+# The tree used by choose_mcts when none is given, reused across a game's turns
+GAME_TREE = MCTSTree()
+
+def choose_mcts(state: "T3State", iterations: Optional[int] = None, deadline: Optional[float] = None,
+                tree: Optional[MCTSTree] = None) -> Optional["T3Action"]:
+    """
+    Chooses a move by Monte Carlo Tree Search, with bounded compute: a number of
+    iterations and / or a time.monotonic() deadline.
+    
+    Parameters:
+        state (T3State):
+            The state to choose a move from
+        iterations (Optional[int]):
+            The number of iterations to run
+        deadline (Optional[float]):
+            The time.monotonic() after which to stop iterating
+        tree (Optional[MCTSTree]):
+            The search tree to grow; if None, the module's GAME_TREE, so that it is
+            reused across the turns of a game (reset it between games)
+    
+    Returns:
+        Optional[T3Action]:
+            None for terminal states, else the chosen action
+    """
+    return (GAME_TREE if tree is None else tree).choose(state, iterations, deadline)
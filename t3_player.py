@@ -5,10 +5,22 @@ Implements the alpha-beta-pruning mini-max search algorithm
 from dataclasses import *
 from typing import *
 from t3_state import *
+from array import array
+import concurrent.futures
+import functools
+import multiprocessing
+import os
+import t3_book
+import t3_store
+import t3_tablebase
+import threading
+import time
 
 "Valeria Sanz Jones"
 
-def choose(state: "T3State") -> Optional["T3Action"]:
+def choose(state: "T3State", table: Optional["TranspositionTable"] = None,
+           deadline: Optional[float] = None, stats: Optional["SearchStats"] = None,
+           ordering: Optional["MoveOrdering"] = None) -> Optional["T3Action"]:
     """
     Main workhorse of the T3Player that makes the optimal decision from the max node
     state given by the parameter to play the game of Tic-Tac-Total.
@@ -22,12 +34,32 @@ def choose(state: "T3State") -> Optional["T3Action"]:
     evaluate the depth if two candidates have the same utility, only continue to
     evaluate the earliest move if two candidates have the same utility and depth.
     
+    States covered by the tablebase at TABLEBASE_PATH, or by the opening book at
+    BOOK_PATH (if either was generated), are answered from it directly; all others
+    are searched. A depth-limited book is only consulted when given a deadline.
+    With a STORE_PATH, states solved before (by any process using the store) are
+    answered from it too, and exhaustive searches add the states they solve.
+    
     Parameters:
         state (T3State):
             The board state from which the agent is making a choice. The board
             state will be either the odds or evens player's turn, and the agent
             should use the T3State methods to simplify its logic to work in
             either case.
+        table (Optional[TranspositionTable]):
+            The transposition table to search with; if None, the module's
+            GAME_TABLE is used so that results persist across calls in a game.
+        deadline (Optional[float]):
+            The time.monotonic() by which a move must be returned; if given,
+            the search deepens iteratively (see deepen) and answers with the
+            best move of the deepest search finished in time. If None, the
+            whole game tree is searched.
+        stats (Optional[SearchStats]):
+            If given, the work done by this choice is added to its counters.
+        ordering (Optional[MoveOrdering]):
+            The history / killer move ordering to search with; if None, the
+            module's GAME_ORDERING, which likewise persists across calls. It
+            changes how fast the move is found, never which move it is.
     
     Returns:
         Optional[T3Action]:
@@ -35,47 +67,1229 @@ def choose(state: "T3State") -> Optional["T3Action"]:
             Otherwise, returns the best T3Action the current player could take
             from the given state by the criteria stated above.
     """
-    # [!] TODO! Implement alpha-beta-pruning minimax search!
+    if ordering is None: ordering = GAME_ORDERING
+    if stats is None: return _choose(state, table, deadline, None, None, ordering)
+    start = time.perf_counter()
+    try:
+        return _choose(state, table, deadline, stats, None, ordering)
+    finally:
+        stats.choices += 1
+        stats.seconds += time.perf_counter() - start
+
+def _choose(state: "T3State", table: Optional["TranspositionTable"], deadline: Optional[float],
+            stats: Optional["SearchStats"], stop: Optional[threading.Event] = None,
+            ordering: Optional["MoveOrdering"] = None) -> Optional["T3Action"]:
+    """
+    The body of choose, apart from timing it; an exhaustive search raises
+    SearchTimeout as soon as the stop event (if any) is set, and searches with the
+    given move ordering (if any).
+    """
     if state.is_win() or state.is_tie(): return None
+    tablebase = _open_tablebase(TABLEBASE_PATH) if TABLEBASE_PATH else None
+    if tablebase is not None:
+        known = tablebase.lookup(state)
+        if known is not None: return known
+    # Winning at once has the best utility and depth there is, so the tiebreak
+    # leaves the earliest of the (complete, sorted) immediate wins
+    wins = state.get_threats()
+    if wins: return wins[0]
+    book = _open_book(BOOK_PATH) if BOOK_PATH else None
+    if book is not None and (book.exact() or deadline is not None):
+        known = book.lookup(state)
+        if known is not None: return known
+    store = _open_store(STORE_PATH) if STORE_PATH else None
+    if store is not None:
+        solved = store.lookup(state)
+        if solved is not None: return solved.action
+    if table is None: table = GAME_TABLE
+    if stats is not None: stats.root_open = state._open
+    if ordering is not None: ordering.age()
+    if deadline is not None: return deepen(state, table, deadline, stats, ordering)
+    # Search on a private copy, since alphabeta steps it in place with apply / undo
+    root = state.copy()
     best_score: float = float("inf") if state._odd_turn else float("-inf")
     best_action: Optional["T3Action"] = None
-    for transition in state.get_transitions():
-        score: float = alphabeta(transition[1], float("-inf"), float("inf"), not transition[1]._odd_turn)
-        if state._odd_turn:
-            if best_score > score:
-                best_score = score
-                best_action = transition[0]
+    actions = sorted(candidate_actions(state))
+    if ordering is not None: actions = _previous_order(root, actions, table, ordering)
+    for action in actions:
+        # Moves may come in any order, so a move must score strictly better than
+        # the best so far, or as well as it if it is earlier in T3Action order
+        earlier = best_action is not None and action < best_action
+        root.apply(action)
+        score = _root_probe(root, best_action is None, best_score, table, stats, stop, earlier, ordering)
+        root.undo(action)
+        if best_action is None or score == best_score and earlier or \
+           (score < best_score if state._odd_turn else score > best_score):
+            best_score = score
+            best_action = action
+    if stats is not None: stats.depth = max(stats.depth, state._open)
+    # If even the best candidate loses right away, so does every move: take the earliest
+    lost = float(state._open - 1) * (1 if state._odd_turn else -1)
+    if store is not None:
+        optimal = list(state.get_actions()) if best_score == lost else \
+                  _optimal_actions(root, actions, best_score, table, stats, stop, ordering)
+        store.put(state, int(best_score), _terminal_depth(state, best_score, state._open), optimal)
+    if best_score == lost and len(actions) < state._open * len(state.get_moves()):
+        return next(iter(state.get_actions()))
+    return best_action
+
+def _root_probe(child: "T3State", first: bool, best: float, table: "TranspositionTable",
+                stats: Optional["SearchStats"], stop: Optional[threading.Event], earlier: bool = False,
+                ordering: Optional["MoveOrdering"] = None) -> float:
+    """
+    Scores a root move of an exhaustive choose by principal variation search: the
+    first move gets a full window, and each later one a null window around the
+    best score so far that just tells whether it beats it (scoring strictly better,
+    or at least as well if it is earlier in T3Action order than the best move),
+    searched again for its exact score if it does.
+    
+    Parameters:
+        child (T3State):
+            The state the root move leads to
+        first (bool):
+            Whether this is the first root move searched
+        best (float):
+            The best (exact) root score so far, evens maximizing
+        table (TranspositionTable):
+            The transposition table to search with
+        stats (Optional[SearchStats]):
+            Counters to add the search's work to, if any
+        stop (Optional[threading.Event]):
+            An event on which to raise SearchTimeout, if any
+        earlier (bool):
+            Whether the move ties the best one by coming first in T3Action order
+        ordering (Optional[MoveOrdering]):
+            The move ordering to search with, if any
+    
+    Returns:
+        float:
+            The move's exact score if it beats best (or is the first), else a
+            bound showing that it does not
+    """
+    inf = float("inf")
+    if first: return alphabeta(child, -inf, inf, not child._odd_turn, table, None, None, stats, stop, ordering)
+    if child._odd_turn:
+        # Evens moved at the root, so the move must score above bar
+        bar = best - 1 if earlier else best
+        score = alphabeta(child, bar, bar + 1, False, table, None, None, stats, stop, ordering)
+        if score > bar: score = alphabeta(child, score - 1, inf, False, table, None, None, stats, stop, ordering)
+    else:
+        bar = best + 1 if earlier else best
+        score = alphabeta(child, bar - 1, bar, True, table, None, None, stats, stop, ordering)
+        if score < bar: score = alphabeta(child, -inf, score + 1, True, table, None, None, stats, stop, ordering)
+    return score
+
+def _optimal_actions(root: "T3State", actions: list["T3Action"], best: float, table: "TranspositionTable",
+                     stats: Optional["SearchStats"], stop: Optional[threading.Event],
+                     ordering: Optional["MoveOrdering"]) -> list["T3Action"]:
+    """
+    Finds every candidate root move of an exhaustive choose that scores its best
+    score exactly (the utility fixing the depth too), by a null-window probe each,
+    cheap once the table holds the search that found the best score.
+    
+    Parameters:
+        root (T3State):
+            The state chosen from (left as it was)
+        actions (list[T3Action]):
+            Its candidate actions
+        best (float):
+            The best (exact) root score, evens maximizing
+        table, stats, stop, ordering:
+            As in _root_probe
+    
+    Returns:
+        list[T3Action]:
+            The optimal actions, in the order given
+    """
+    optimal = []
+    for act in actions:
+        root.apply(act)
+        score = _root_probe(root, False, best, table, stats, stop, True, ordering)
+        root.undo(act)
+        if score == best: optimal.append(act)
+    return optimal
+
+def _previous_order(root: "T3State", actions: list["T3Action"], table: "TranspositionTable",
+                    ordering: "MoveOrdering") -> list["T3Action"]:
+    """
+    Orders the root moves of an exhaustive choose best first by the scores that
+    earlier searches (of this or former choose calls) left in the table for the
+    positions they lead to, moves without one coming last in history order.
+    
+    Parameters:
+        root (T3State):
+            The state being chosen from (left as it was)
+        actions (list[T3Action]):
+            Its candidate actions, in T3Action order
+        table (TranspositionTable):
+            The transposition table to take the scores from
+        ordering (MoveOrdering):
+            The move ordering to break ties with
+    
+    Returns:
+        list[T3Action]:
+            The same actions, in the order to search them
+    """
+    sign = -1 if root._odd_turn else 1
+    scores: dict["T3Action", float] = {}
+    for act in actions:
+        root.apply(act)
+        entry = table.probe(table_key(root))
+        root.undo(act)
+        if entry is not None: scores[act] = sign * entry.value
+    actions = ordering.order(root, actions)
+    return sorted(actions, key=lambda act: -scores[act] if act in scores else float("inf"))
+
+# Bound types of a TTEntry's value: exactly the minimax value, or only a lower /
+# upper bound on it (from a search that failed high / low of its window)
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+@dataclass
+class TTEntry:
+    """
+    A single transposition table record: the value found for a position, what kind
+    of bound that value is, and the depth (in plies) of the terminal backing it.
+    """
+    
+    value: float
+    flag: int
+    depth: int
+    # Plies searched below the position; its open tile count if searched to the end
+    draft: int
+
+# Transposition table key: a position's canonical_key and its rules' key
+TableKey = tuple[tuple[int, ...], bool, tuple[int, int, int]]
+
+def table_key(state: "T3State") -> TableKey:
+    """
+    Returns:
+        TableKey:
+            The key of a state in transposition tables: its canonical_key, together
+            with the key of its rules so that one table may serve several variants
+    """
+    image, odd_turn = state.canonical_key()
+    return (image, odd_turn, state._rules.key())
+
+class TranspositionTable:
+    """
+    Cache of searched positions keyed by table_key, so that a position reached by
+    different move orders, or any rotation / reflection of it, is only searched
+    once. Entries searched to the end are exact game-theoretic values and
+    stay valid for the rest of the game, so the table may persist across choose
+    calls (call clear, or new_game, to release it); depth-limited entries are only
+    used by searches that need no deeper a draft.
+    """
+    
+    def __init__(self) -> None:
+        self._entries: dict[TableKey, TTEntry] = {}
+        self.probes: int = 0
+        self.hits: int = 0
+    
+    def probe(self, key: TableKey) -> Optional[TTEntry]:
+        """
+        Parameters:
+            key (TableKey):
+                The table_key of the position being looked up
+        
+        Returns:
+            Optional[TTEntry]:
+                The stored entry for the position, or None if it was never stored
+        """
+        self.probes += 1
+        entry = self._entries.get(key)
+        if entry is not None: self.hits += 1
+        return entry
+    
+    def store(self, key: TableKey, value: float, flag: int, depth: int, draft: int) -> None:
+        """
+        Records the searched value of the position with the given key, unless an
+        entry of a deeper draft is already stored for it.
+        
+        Parameters:
+            key (TableKey):
+                The table_key of the searched position
+            value (float):
+                The value returned by the search
+            flag (int):
+                One of EXACT, LOWER or UPPER
+            depth (int):
+                Plies from the position to the terminal that produced the value
+            draft (int):
+                Plies searched below the position
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.draft > draft: return
+        self._entries[key] = TTEntry(value, flag, depth, draft)
+    
+    def hit_rate(self) -> float:
+        """
+        Returns:
+            float:
+                The fraction of probes that found an entry (0 if never probed)
+        """
+        return self.hits / self.probes if self.probes else 0.0
+    
+    def clear(self) -> None:
+        """
+        Drops every entry and resets the probe / hit counters.
+        """
+        self._entries.clear()
+        self.probes = 0
+        self.hits = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class BoundedTable(TranspositionTable):
+    """
+    A TranspositionTable of fixed capacity for boards too big to keep every searched
+    position, packed into preallocated arrays (a 64-bit lock, the value, flag, depth
+    and draft of each entry: ENTRY_BYTES apiece) sized to a byte budget, so that its
+    memory never grows however long it searches. Positions hash (by table_key)
+    to a bucket of two slots: a depth-preferred one, keeping the entry of the
+    deepest draft, and an always-replace one, taking every other newcomer (or the
+    entry a deeper one displaces), so that fresh shallow results are still cached.
+    """
+    
+    ENTRY_BYTES = 8 + 8 + 1 + 1 + 1
+    
+    def __init__(self, budget: int = 64 << 20):
+        """
+        Parameters:
+            budget (int):
+                The most bytes the entry arrays may take
+        
+        [!] Raises a ValueError if the budget cannot fit a single bucket
+        """
+        super().__init__()
+        self._buckets = budget // (2 * self.ENTRY_BYTES)
+        if self._buckets < 1:
+            raise ValueError("[X] A byte budget of " + str(budget) + " cannot fit a table bucket")
+        self.capacity = self._buckets * 2
+        self._locks = array("q", [0]) * self.capacity
+        self._values = array("d", [0.0]) * self.capacity
+        self._flags = array("B", [0]) * self.capacity
+        self._depths = array("B", [0]) * self.capacity
+        self._drafts = array("B", [0]) * self.capacity
+        self._used = 0
+        # Probes that found only other positions in the bucket, and stores that
+        # overwrote another position's entry
+        self.collisions: int = 0
+        self.evictions: int = 0
+    
+    def nbytes(self) -> int:
+        """
+        Returns:
+            int:
+                The bytes taken by the entry arrays (at most the budget)
+        """
+        return self.capacity * self.ENTRY_BYTES
+    
+    def fill(self) -> float:
+        """
+        Returns:
+            float:
+                The fraction of slots holding an entry
+        """
+        return self._used / self.capacity
+    
+    def _slot(self, key: TableKey) -> tuple[int, int]:
+        """
+        Returns:
+            tuple[int, int]:
+                The key's lock (its nonzero 64-bit hash) and its bucket's first slot
+        """
+        lock = hash(key) or 1
+        return (lock, lock % self._buckets * 2)
+    
+    def probe(self, key: TableKey) -> Optional[TTEntry]:
+        self.probes += 1
+        lock, slot = self._slot(key)
+        locks = self._locks
+        if locks[slot] != lock:
+            slot += 1
+            if locks[slot] != lock:
+                if locks[slot] or locks[slot - 1]: self.collisions += 1
+                return None
+        self.hits += 1
+        return TTEntry(self._values[slot], self._flags[slot], self._depths[slot], self._drafts[slot])
+    
+    def store(self, key: TableKey, value: float, flag: int, depth: int, draft: int) -> None:
+        lock, slot = self._slot(key)
+        locks, drafts = self._locks, self._drafts
+        if locks[slot] == lock or locks[slot + 1] == lock:
+            if locks[slot] != lock: slot += 1
+            if drafts[slot] > draft: return
+        elif not locks[slot] or draft >= drafts[slot]:
+            # Into the depth-preferred slot, demoting its entry to the other one
+            if locks[slot]:
+                self._evict(slot + 1, locks[slot])
+                self._put(slot + 1, locks[slot], self._values[slot], self._flags[slot],
+                          self._depths[slot], drafts[slot])
+            else:
+                self._used += 1
         else:
-            if best_score < score:
-                best_score = score
-                best_action = transition[0]
+            slot += 1
+            self._evict(slot, lock)
+        self._put(slot, lock, value, flag, depth, draft)
+    
+    def _evict(self, slot: int, lock: int) -> None:
+        """
+        Counts what writing the entry with the given lock into a slot replaces.
+        """
+        old = self._locks[slot]
+        if not old: self._used += 1
+        elif old != lock: self.evictions += 1
+    
+    def _put(self, slot: int, lock: int, value: float, flag: int, depth: int, draft: int) -> None:
+        """
+        Writes an entry into a slot.
+        """
+        self._locks[slot] = lock
+        self._values[slot] = value
+        self._flags[slot] = flag
+        self._depths[slot] = depth
+        self._drafts[slot] = draft
+    
+    def clear(self) -> None:
+        super().clear()
+        for column in (self._locks, self._flags, self._depths, self._drafts):
+            column[:] = array(column.typecode, [0]) * self.capacity
+        self._used = 0
+        self.collisions = 0
+        self.evictions = 0
+    
+    def report(self) -> str:
+        """
+        Returns:
+            str:
+                A one-line human-readable summary of the table's statistics
+        """
+        return "capacity=" + str(self.capacity) + " bytes=" + str(self.nbytes()) + \
+               " fill=" + format(self.fill(), ".1%") + " hit_rate=" + format(self.hit_rate(), ".1%") + \
+               " collisions=" + str(self.collisions) + " evictions=" + str(self.evictions)
+    
+    def __len__(self) -> int:
+        return self._used
+
+class MoveOrdering:
+    """
+    History and killer move heuristics, which reorder the children alphabeta
+    searches (never which children it searches) so that cutoffs come early. A move
+    that caused a beta cutoff scores its player draft ** 2 of history, and becomes
+    one of the killers of its ply (as the board's open tile count, which identifies
+    the ply in any search of a game); killers are tried first, then the rest by
+    history, though never ahead of the forcing moves candidate_actions puts first.
+    Meant to persist across a game's choose calls (see GAME_ORDERING), aging its
+    history at the start of each so that recent cutoffs weigh the most.
+    """
+    
+    # Killer moves kept per ply
+    KILLERS = 2
+    
+    def __init__(self) -> None:
+        # History score of each move, keyed by T3Action code * 2 + odd_turn
+        self._history: dict[int, int] = {}
+        self._killers: dict[int, list["T3Action"]] = {}
+    
+    def order(self, state: "T3State", actions: list["T3Action"], forcing: int = 0) -> list["T3Action"]:
+        """
+        Parameters:
+            state (T3State):
+                The state whose children are about to be searched
+            actions (list[T3Action]):
+                Its actions to search, in their default order
+            forcing (int):
+                How many of the actions (at the front) are forcing moves, which
+                are ordered among themselves and kept ahead of the rest
+        
+        Returns:
+            list[T3Action]:
+                The same actions, killers first and then by decreasing history
+                (stable, so ties keep their default order)
+        """
+        if forcing and forcing < len(actions):
+            return self.order(state, actions[:forcing]) + self.order(state, actions[forcing:])
+        history, side = self._history, state._odd_turn
+        if history:
+            actions = sorted(actions, key=lambda act: -history.get(act._code * 2 + side, 0))
+        killers = self._killers.get(state._open)
+        if killers:
+            first = [act for act in killers if act in actions]
+            if first: actions = first + [act for act in actions if act not in first]
+        return actions
+    
+    def cutoff(self, state: "T3State", act: "T3Action", draft: int) -> None:
+        """
+        Records that act, played in state, caused a beta cutoff.
+        
+        Parameters:
+            state (T3State):
+                The state the cutoff happened in
+            act (T3Action):
+                The action that caused it
+            draft (int):
+                Plies searched below state
+        """
+        # Replaced rather than updated in place, as threads may share the ordering
+        # (and another may be iterating over the history, as age does)
+        key = act._code * 2 + state._odd_turn
+        history = dict(self._history)
+        history[key] = history.get(key, 0) + draft * draft
+        self._history = history
+        killers = [act] + [killer for killer in self._killers.get(state._open, ()) if killer != act]
+        self._killers[state._open] = killers[:MoveOrdering.KILLERS]
+    
+    def age(self) -> None:
+        """
+        Halves every history score, forgetting those that reach 0.
+        """
+        self._history = {key: score >> 1 for key, score in list(self._history.items()) if score > 1}
+    
+    def clear(self) -> None:
+        self._history.clear()
+        self._killers.clear()
+
+@dataclass
+class SearchStats:
+    """
+    Counters of the work done by choose (and the searches under it), filled in when
+    passed as its stats argument and accumulated over every choice made with it.
+    Searches given no SearchStats skip all of this bookkeeping.
+    """
+    
+    # Number of choose calls, and the wall-clock seconds spent in them
+    choices: int = 0
+    seconds: float = 0.0
+    # alphabeta calls, and how many of them expanded children (and how many)
+    nodes: int = 0
+    interior: int = 0
+    children: int = 0
+    # Beta cutoffs, by ply below the root of the choice they happened in
+    cutoffs: dict[int, int] = field(default_factory=dict)
+    # Transposition table lookups, and how many found an entry
+    table_probes: int = 0
+    table_hits: int = 0
+    # Deepest fully searched ply (all remaining plies for exhaustive searches)
+    depth: int = 0
+    # Open tiles at the root of the current choice, to tell the ply of a node
+    root_open: int = 0
+    
+    def record_expansion(self, state: "T3State", searched: int, cutoff: bool) -> None:
+        """
+        Counts one interior node.
+        
+        Parameters:
+            state (T3State):
+                The expanded state
+            searched (int):
+                How many of its children were searched
+            cutoff (bool):
+                Whether the search of its children was cut off
+        """
+        self.interior += 1
+        self.children += searched
+        if cutoff:
+            ply = self.root_open - state._open
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+    
+    def merge(self, other: "SearchStats") -> None:
+        """
+        Adds another SearchStats' counters (e.g., from a worker process) into these.
+        
+        Parameters:
+            other (SearchStats):
+                The counters to add
+        """
+        self.choices += other.choices
+        self.seconds += other.seconds
+        self.nodes += other.nodes
+        self.interior += other.interior
+        self.children += other.children
+        for ply, count in other.cutoffs.items():
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + count
+        self.table_probes += other.table_probes
+        self.table_hits += other.table_hits
+        self.depth = max(self.depth, other.depth)
+    
+    def branching_factor(self) -> float:
+        """
+        Returns:
+            float:
+                The mean number of children searched per interior node
+        """
+        return self.children / self.interior if self.interior else 0.0
+    
+    def nodes_per_second(self) -> float:
+        """
+        Returns:
+            float:
+                Nodes searched per second of choosing
+        """
+        return self.nodes / self.seconds if self.seconds else 0.0
+    
+    def report(self) -> str:
+        """
+        Returns:
+            str:
+                A one-line human-readable summary of the counters
+        """
+        per_move = self.seconds / self.choices if self.choices else 0.0
+        hit_rate = self.table_hits / self.table_probes if self.table_probes else 0.0
+        cutoffs = ", ".join([str(ply) + ":" + str(self.cutoffs[ply]) for ply in sorted(self.cutoffs)])
+        return "nodes=" + str(self.nodes) + " nps=" + str(round(self.nodes_per_second())) + \
+               " branching=" + format(self.branching_factor(), ".2f") + " depth=" + str(self.depth) + \
+               " tt_hits=" + format(hit_rate, ".1%") + " time/move=" + format(per_move, ".3f") + "s" + \
+               " cutoffs_by_ply={" + cutoffs + "}"
+
+# The table used by choose when none is given; lives for the duration of a game
+GAME_TABLE = TranspositionTable()
+# The move ordering used by choose when none is given; likewise lives for a game
+GAME_ORDERING = MoveOrdering()
+
+# Tablebase file consulted by choose before searching (None to always search);
+# generated offline with `python t3_tablebase.py`, and skipped if not present
+TABLEBASE_PATH: Optional[str] = t3_tablebase.DEFAULT_PATH
+
+@functools.lru_cache(maxsize=None)
+def _open_tablebase(path: str) -> Optional[t3_tablebase.Tablebase]:
+    """
+    Memory-maps the tablebase at the given path once per process.
+    
+    Parameters:
+        path (str):
+            The tablebase file
+    
+    Returns:
+        Optional[t3_tablebase.Tablebase]:
+            The opened tablebase, or None if there is no file at path
+    """
+    return t3_tablebase.Tablebase(path) if os.path.exists(path) else None
+
+# Opening book file consulted by choose before searching (None to always search);
+# generated offline with `python t3_book.py`, and skipped if not present
+BOOK_PATH: Optional[str] = t3_book.DEFAULT_PATH
+
+@functools.lru_cache(maxsize=None)
+def _open_book(path: str) -> Optional[t3_book.OpeningBook]:
+    """
+    Loads the opening book at the given path once per process, on first use.
+    
+    Parameters:
+        path (str):
+            The opening book file
+    
+    Returns:
+        Optional[t3_book.OpeningBook]:
+            The loaded book, or None if there is no file at path
+    """
+    return t3_book.OpeningBook(path) if os.path.exists(path) else None
+
+# Solved-position store consulted and filled by choose (None for none); shared by
+# every process given the same path, and kept across restarts
+STORE_PATH: Optional[str] = None
+
+@functools.lru_cache(maxsize=None)
+def _open_store(path: str) -> t3_store.SolvedStore:
+    """
+    Opens the solved-position store at the given path once per process.
+    
+    Parameters:
+        path (str):
+            The store's database file (created if missing)
+    
+    Returns:
+        t3_store.SolvedStore:
+            The open store
+    """
+    return t3_store.open_store(path)
+
+def new_game() -> None:
+    """
+    Resets the shared GAME_TABLE and GAME_ORDERING; call at the start of each game.
+    """
+    GAME_TABLE.clear()
+    GAME_ORDERING.clear()
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search whose deadline has passed (or whose stop event was set),
+    unwinding it to deepen (or the Ponderer).
+    """
+
+def deepen(state: "T3State", table: TranspositionTable, deadline: float,
+           stats: Optional["SearchStats"] = None, ordering: Optional[MoveOrdering] = None) -> Optional["T3Action"]:
+    """
+    Anytime iterative-deepening search: searches the root to depth 1, 2, ... with
+    the evaluate heuristic at the horizon, each iteration trying root moves in the
+    order of the previous one's scores, until the whole tree is searched or the
+    deadline passes. The first iteration always completes, so a move is ready at
+    any moment after that; a cut-short iteration is still used once it has scored
+    the previous best move (which it tries first).
+    
+    Parameters:
+        state (T3State):
+            The non-terminal state to choose a move from
+        table (TranspositionTable):
+            The transposition table to search with
+        deadline (float):
+            The time.monotonic() by which to stop searching
+        stats (Optional[SearchStats]):
+            Counters to add the search's work to, if any
+        ordering (Optional[MoveOrdering]):
+            The move ordering to search below the root with, if any
+    
+    Returns:
+        Optional[T3Action]:
+            The best action of the deepest search, under choose's tiebreaking
+    """
+    root = state.copy()
+    sign = -1 if state._odd_turn else 1
+    order = list(state.get_actions())
+    best_action: Optional["T3Action"] = None
+    for depth in range(1, state._open + 1):
+        scores: dict["T3Action", float] = {}
+        try:
+            for action in order:
+                root.apply(action)
+                scores[action] = sign * alphabeta(root, float("-inf"), float("inf"), not root._odd_turn,
+                                                  table, depth - 1, deadline if depth > 1 else None, stats,
+                                                  None, ordering)
+                root.undo(action)
+        except SearchTimeout:
+            pass
+        ranking = lambda a: (-scores[a], a._code)
+        if scores: best_action = min(scores, key=ranking)
+        if len(scores) < len(order): break
+        if stats is not None: stats.depth = max(stats.depth, depth)
+        order.sort(key=ranking)
     return best_action
 
-# [Optional / Suggested] TODO! Add any helper methods or dataclasses needed to
-# manage the alpha-beta-pruning minimax operation
+def evaluate(state: "T3State") -> float:
+    """
+    Heuristic value of a non-terminal state at a depth-limited search's horizon,
+    on the same scale as alphabeta (evens maximizing). It is kept strictly within
+    (-1, 1), so it never outweighs a proven win or loss. alphabeta scores a state
+    whose player to move can complete a line right away (see get_threats) before
+    reaching its horizon, so only lines the opponent can complete next remain to
+    weigh: they are threats that must be blocked, and two or more nearly a loss.
+    
+    Parameters:
+        state (T3State):
+            The state at the horizon, where the player to move has no threats
+    
+    Returns:
+        float:
+            The estimated value of the state
+    """
+    theirs = state._rules.completions[not state._odd_turn]
+    need_theirs = 0
+    for line, fill in enumerate(state._fills):
+        if fill != state._cols and theirs[state._sums[line]]: need_theirs += 1
+    score = -0.6 if need_theirs > 1 else -0.2 * need_theirs
+    return -score if state._odd_turn else score
 
-def alphabeta(state: "T3State", alpha: float, beta: float, is_max: bool) -> float:
+def alphabeta(state: "T3State", alpha: float, beta: float, is_max: bool, table: Optional[TranspositionTable] = None,
+              depth: Optional[int] = None, deadline: Optional[float] = None,
+              stats: Optional["SearchStats"] = None, stop: Optional[threading.Event] = None,
+              ordering: Optional["MoveOrdering"] = None) -> float:
+    """
+    Fail-soft alpha-beta minimax value of the given state, where the evens player
+    maximizes and a win is worth one more than the open tiles left after it.
+    
+    [!] Children are visited by stepping state in place with apply / undo, so the
+    state is modified during the call (and restored before it returns).
+    
+    Parameters:
+        state (T3State):
+            The position to evaluate
+        alpha (float):
+            The value the maximizer is already assured of
+        beta (float):
+            The value the minimizer is already assured of
+        is_max (bool):
+            Whether the player to move in state is the maximizer (evens)
+        table (Optional[TranspositionTable]):
+            Table to probe and fill with searched positions, if any
+        depth (Optional[int]):
+            Plies to search before falling back to evaluate; None for no limit
+        deadline (Optional[float]):
+            The time.monotonic() after which to raise SearchTimeout, if any
+        stats (Optional[SearchStats]):
+            Counters to add the search's work to, if any
+        stop (Optional[threading.Event]):
+            An event on which to raise SearchTimeout, if any (e.g., to interrupt
+            a Ponderer's search from another thread)
+        ordering (Optional[MoveOrdering]):
+            Move ordering to order children by and record cutoffs in, if any;
+            children are otherwise searched in candidate_actions order
+    
+    Returns:
+        float:
+            The minimax value if it lies within (alpha, beta), else a bound beyond
+            whichever of the two it failed on
+    """
+    if stats is not None: stats.nodes += 1
     if state.is_tie(): return 0
     if state.is_win():
-        utility: float = float(len(state.get_open_tiles())+1)
+        utility: float = float(state._open+1)
         return utility if state._odd_turn else -utility
+    if deadline is not None and time.monotonic() >= deadline: raise SearchTimeout()
+    if stop is not None and stop.is_set(): raise SearchTimeout()
+    if state.get_threats():
+        # The fastest possible win: one more than the open tiles left after it
+        return -float(state._open) if state._odd_turn else float(state._open)
+    draft = state._open if depth is None else min(depth, state._open)
+    if draft == 0: return evaluate(state)
+    child_depth = None if depth is None else depth - 1
+    
+    key = table_key(state) if table is not None else None
+    alpha_orig, beta_orig = alpha, beta
+    if table is not None and key is not None:
+        entry = table.probe(key)
+        if stats is not None:
+            stats.table_probes += 1
+            stats.table_hits += entry is not None
+        if entry is not None and entry.draft >= draft:
+            if entry.flag == EXACT: return entry.value
+            if entry.flag == LOWER: alpha = max(alpha, entry.value)
+            else: beta = min(beta, entry.value)
+            if beta <= alpha: return entry.value
 
+    # Principal variation search: the first child gets the full window, the rest a
+    # null window (alpha, alpha + 1) that only tells whether they beat it; utilities
+    # are integers, so a value within it is exact, and one failing high is searched
+    # again, from just below the lower bound it proved, only if it may be below beta
+    searched = 0
+    actions, forcing = _candidates(state)
+    if ordering is not None and len(actions) > 1: actions = ordering.order(state, actions, forcing)
     if is_max:
         max_util: float = float('-inf')
-        for _, child in state.get_transitions():
-            util = alphabeta(child, alpha, beta, False)
+        for act in actions:
+            state.apply(act)
+            if not searched:
+                util = alphabeta(state, alpha, beta, False, table, child_depth, deadline, stats, stop, ordering)
+            else:
+                util = alphabeta(state, alpha, alpha + 1, False, table, child_depth, deadline, stats, stop, ordering)
+                if alpha + 1 <= util < beta:
+                    util = alphabeta(state, util - 1, beta, False, table, child_depth, deadline, stats, stop, ordering)
+            state.undo(act)
+            searched += 1
             max_util = max(max_util, util)
             alpha = max(alpha, util)
             if beta <= alpha:
+                if ordering is not None: ordering.cutoff(state, act, draft)
                 break
-        return max_util
+        value = max_util
 
     else:
         min_util: float = float('inf')
-        for _, child in state.get_transitions():
-            util = alphabeta(child, alpha, beta, True)
+        for act in actions:
+            state.apply(act)
+            if not searched:
+                util = alphabeta(state, alpha, beta, True, table, child_depth, deadline, stats, stop, ordering)
+            else:
+                util = alphabeta(state, beta - 1, beta, True, table, child_depth, deadline, stats, stop, ordering)
+                if alpha < util <= beta - 1:
+                    util = alphabeta(state, alpha, util + 1, True, table, child_depth, deadline, stats, stop, ordering)
+            state.undo(act)
+            searched += 1
             min_util = min(min_util, util)
             beta = min(beta, util)
             if beta <= alpha:
+                if ordering is not None: ordering.cutoff(state, act, draft)
                 break
-        return min_util
\ No newline at end of file
+        value = min_util
+    if stats is not None: stats.record_expansion(state, searched, beta <= alpha)
+    
+    if table is not None and key is not None:
+        flag = UPPER if value <= alpha_orig else LOWER if value >= beta_orig else EXACT
+        table.store(key, value, flag, _terminal_depth(state, value, draft), draft)
+    return value
+
+def candidate_actions(state: "T3State") -> list["T3Action"]:
+    """
+    The children alphabeta needs to search for a state's value (in which the player
+    to move has no immediate win). If the opponent threatens to win next move, only
+    the moves into their threatened tiles are searched; otherwise, moves that hand
+    the opponent a winning reply are dropped (they lose at once, so are never worth
+    more than any other move) unless every move does so, in which case any single
+    one of them gives the value. Of the rest, moves that leave the player to move
+    a threat of their own come first, as the opponent's replies are then forced.
+    
+    Parameters:
+        state (T3State):
+            The state being searched
+    
+    Returns:
+        list[T3Action]:
+            The actions to search, forcing moves first, else in T3Action order
+    """
+    return _candidates(state)[0]
+
+def _candidates(state: "T3State") -> tuple[list["T3Action"], int]:
+    """
+    Returns:
+        tuple[list[T3Action], int]:
+            The candidate_actions of a state, and how many of them (at the front)
+            are forcing moves
+    """
+    blocks = {(act._col, act._row) for act in state.get_threats(not state._odd_turn)}
+    if blocks: return ([act for act in state.get_actions() if (act._col, act._row) in blocks], 0)
+    n, sums, fills, odd_turn = state._cols, state._sums, state._fills, state._odd_turn
+    mine, theirs = state._rules.completions[odd_turn], state._rules.completions[not odd_turn]
+    forcing: list["T3Action"] = []
+    quiet: list["T3Action"] = []
+    losing: list["T3Action"] = []
+    for act in state.get_actions():
+        threat = gift = False
+        for line in state._lines[act._row * n + act._col]:
+            # Only lines with a tile still open after the move can be completed next
+            if fills[line] > n - 2: continue
+            partial = sums[line] + act._move
+            if mine[partial]: threat = True
+            elif theirs[partial]: gift = True
+        (losing if gift else forcing if threat else quiet).append(act)
+    return (forcing + quiet, len(forcing)) if forcing or quiet else (losing[:1], 0)
+
+def _terminal_depth(state: "T3State", value: float, draft: int) -> int:
+    """
+    Recovers the depth of the terminal behind a search value: wins are worth one
+    more than the open tiles left after them, and ties only occur on a full board.
+    Values strictly within (-1, 1) are heuristic, so no terminal is behind them.
+    
+    Parameters:
+        state (T3State):
+            The position the value was searched from
+        value (float):
+            The (exact or bounding) value found for it
+        draft (int):
+            Plies searched below state, reported for heuristic values
+    
+    Returns:
+        int:
+            Plies from state to the terminal implied by value
+    """
+    open_tiles = state._open
+    if abs(value) < 1 and draft < open_tiles: return draft
+    return open_tiles if value == 0 else open_tiles - int(abs(value)) + 1
+
+@dataclass
+class MoveAnalysis:
+    """
+    The exact evaluation of one root move, as returned by analyze.
+    """
+    
+    action: "T3Action"
+    # Utility to the player making the move: positive for a win (one more than the
+    # open tiles left after it), negative for a loss, 0 for a tie
+    utility: int
+    # Plies from the analyzed state to the terminal, with best play by both sides
+    depth: int
+    # The line of best play (under choose's tiebreaking), starting with action
+    pv: list["T3Action"]
+
+def analyze(state: "T3State", top_k: Optional[int] = None,
+            table: Optional["TranspositionTable"] = None) -> list[MoveAnalysis]:
+    """
+    Evaluates the root moves of a state exactly, from one search sharing a single
+    transposition table: each move is searched in T3Action order, and once top_k
+    moves are known exactly, later ones only get a null window proving that they
+    do not beat the k-th best (as in choose). The principal variations replay
+    choose from each move on, answered mostly from the table the search filled.
+    
+    Parameters:
+        state (T3State):
+            The state to analyze
+        top_k (Optional[int]):
+            How many of the best moves to return; None for all of them
+        table (Optional[TranspositionTable]):
+            The transposition table to search with; by default GAME_TABLE
+    
+    Returns:
+        list[MoveAnalysis]:
+            The moves in choose's order of preference (utility, then depth, then
+            T3Action order), so that the first is the one choose(state) returns;
+            empty for terminal states
+    """
+    if state.is_win() or state.is_tie() or top_k == 0: return []
+    if table is None: table = GAME_TABLE
+    root = state.copy()
+    sign = -1 if state._odd_turn else 1
+    best: list[tuple[float, "T3Action"]] = []
+    for act in state.get_actions():
+        full = top_k is None or len(best) < top_k
+        root.apply(act)
+        if full:
+            score = sign * alphabeta(root, float("-inf"), float("inf"), not root._odd_turn, table)
+        else:
+            # To make the top_k, a later move must beat the k-th best strictly
+            score = sign * _root_probe(root, False, sign * best[-1][0], table, None, None)
+        root.undo(act)
+        if full or score > best[-1][0]:
+            best.append((score, act))
+            best.sort(key=lambda pair: -pair[0])
+            del best[len(best) if top_k is None else top_k:]
+    results = []
+    for score, act in best:
+        child = state.get_next_state(act)
+        pv = [act]
+        while not child.is_win() and not child.is_tie():
+            reply = cast("T3Action", choose(child, table))
+            pv.append(reply)
+            child.apply(reply)
+        results.append(MoveAnalysis(act, int(score), len(pv), pv))
+    return results
+
+class Ponderer:
+    """
+    Searches in a background thread while the opponent thinks: every reply the
+    opponent can make to a given state is searched in turn, likeliest first (blocks
+    and forcing moves before quiet ones), and the best answer to each is kept, along
+    with everything the searches add to the transposition table. Once the opponent
+    has moved, answer gives the move choose would have made, if it was pondered.
+    """
+    
+    def __init__(self, table: Optional[TranspositionTable] = None):
+        """
+        Parameters:
+            table (Optional[TranspositionTable]):
+                The table to search with; by default the module's GAME_TABLE, so
+                that unfinished ponders still speed up the next choose
+        """
+        self._table = GAME_TABLE if table is None else table
+        self._answers: dict["T3State", Optional["T3Action"]] = {}
+        self._state: Optional["T3State"] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Number of answer calls that found a pondered move
+        self.hits: int = 0
+    
+    def start(self, state: "T3State") -> None:
+        """
+        Starts pondering the replies to the given state (where the opponent is to
+        move), unless it is already being pondered.
+        
+        Parameters:
+            state (T3State):
+                The state the opponent is thinking about
+        """
+        if self._state == state and self._thread is not None: return
+        self.stop()
+        self._answers.clear()
+        self._state = state.copy()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(state.copy(),), daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """
+        Interrupts the pondering (keeping the answers found so far) and waits for
+        the thread to finish; the table must not be searched by anything else
+        until this returns.
+        """
+        if self._thread is None: return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+    
+    def answer(self, state: "T3State") -> Optional["T3Action"]:
+        """
+        Stops pondering and looks up the answer to the given state.
+        
+        Parameters:
+            state (T3State):
+                The state reached by the opponent's move
+        
+        Returns:
+            Optional[T3Action]:
+                The action choose(state) (without a deadline) returns, if the
+                state's search finished; otherwise None
+        """
+        self.stop()
+        act = self._answers.get(state)
+        if act is not None: self.hits += 1
+        return act
+    
+    def _run(self, state: "T3State") -> None:
+        """
+        The pondering thread: searches each reply's resulting state to the end.
+        """
+        replies = candidate_actions(state) if not state.get_threats() else []
+        seen = set(replies)
+        replies += [act for act in state.get_actions() if act not in seen]
+        try:
+            for act in replies:
+                child = state.get_next_state(act)
+                if child.is_win() or child.is_tie(): continue
+                self._answers[child] = _choose(child, self._table, None, None, self._stop)
+        except SearchTimeout:
+            pass
+
+class ParallelSearch:
+    """
+    Exhaustive root-split search across a process pool: the first root move (the
+    eldest brother) is searched locally to seed a bound, then the remaining moves
+    are searched concurrently by the pool's workers, each with its own persistent
+    transposition table. Workers share the best root score proven so far, so every
+    task starts from the tightest bound available and cuts off moves that cannot
+    match it. Choices are deterministic: any move that could win the tiebreak is
+    searched with a window that keeps its score exact.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Starts the worker pool.
+        
+        Parameters:
+            max_workers (Optional[int]):
+                Number of worker processes; defaults to the number of CPUs
+        """
+        self._bound: Any = multiprocessing.Value("d", float("-inf"))
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(self._bound,))
+    
+    def choose(self, state: "T3State", stats: Optional[SearchStats] = None) -> Optional["T3Action"]:
+        """
+        Same contract (and result) as the module's choose without a deadline.
+        
+        Parameters:
+            state (T3State):
+                The board state from which the agent is making a choice
+            stats (Optional[SearchStats]):
+                If given, the work done by this process and every worker is added
+                to its counters
+        
+        Returns:
+            Optional[T3Action]:
+                None for terminal states, else the best action by choose's
+                tiebreaking criteria
+        """
+        start = time.perf_counter()
+        if state.is_win() or state.is_tie(): return None
+        tablebase = _open_tablebase(TABLEBASE_PATH) if TABLEBASE_PATH else None
+        if tablebase is not None:
+            known = tablebase.lookup(state)
+            if known is not None: return known
+        actions = list(state.get_actions())
+        if stats is not None: stats.root_open = state._open
+        eldest = _root_score(state.copy(), actions[0], float("-inf"), GAME_TABLE, stats)
+        self._bound.value = eldest
+        board = state.board()
+        futures = [self._executor.submit(_search_root_move, board, state._odd_turn, state._rules, act,
+                                         stats is not None) for act in actions[1:]]
+        scores = [eldest]
+        for future in futures:
+            score, worker_stats = future.result()
+            scores.append(score)
+            if stats is not None and worker_stats is not None: stats.merge(worker_stats)
+        if stats is not None:
+            stats.choices += 1
+            stats.seconds += time.perf_counter() - start
+            stats.depth = max(stats.depth, state._open)
+        best = min(range(len(actions)), key=lambda i: (-scores[i], i))
+        return actions[best]
+    
+    def close(self) -> None:
+        """
+        Shuts the worker pool down.
+        """
+        self._executor.shutdown()
+    
+    def __enter__(self) -> "ParallelSearch":
+        return self
+    
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+def choose_parallel(state: "T3State", max_workers: Optional[int] = None) -> Optional["T3Action"]:
+    """
+    Convenience wrapper making a single choice with a temporary ParallelSearch;
+    keep a ParallelSearch open instead when choosing repeatedly.
+    
+    Parameters:
+        state (T3State):
+            The board state from which the agent is making a choice
+        max_workers (Optional[int]):
+            Number of worker processes; defaults to the number of CPUs
+    
+    Returns:
+        Optional[T3Action]:
+            The action choose(state) would return
+    """
+    with ParallelSearch(max_workers) as search:
+        return search.choose(state)
+
+def _root_score(state: "T3State", act: "T3Action", bound: float, table: TranspositionTable,
+                stats: Optional[SearchStats] = None) -> float:
+    """
+    Searches one root move, scored for the player to move in state, with a window
+    that is exact for any score at least bound (utilities are integers) and only
+    proves the score is below bound otherwise.
+    
+    Parameters:
+        state (T3State):
+            The root state, which is stepped in place and restored
+        act (T3Action):
+            The root move to search
+        bound (float):
+            The best score another root move is already proven to have
+        table (TranspositionTable):
+            The transposition table to search with
+        stats (Optional[SearchStats]):
+            Counters to add the search's work to, if any
+    
+    Returns:
+        float:
+            The move's score to the root's mover if at least bound, else an upper
+            bound on it that is less than bound
+    """
+    odd_turn = state._odd_turn
+    state.apply(act)
+    if odd_turn:
+        score = -alphabeta(state, float("-inf"), -bound + 1, True, table, None, None, stats)
+    else:
+        score = alphabeta(state, bound - 1, float("inf"), False, table, None, None, stats)
+    state.undo(act)
+    return score
+
+# The ParallelSearch bound shared with this process, when it is one of its workers
+_shared_bound: Any = None
+
+def _init_worker(bound: Any) -> None:
+    """
+    ParallelSearch pool initializer; keeps the shared bound for _search_root_move.
+    """
+    global _shared_bound
+    _shared_bound = bound
+
+def _search_root_move(board: list[list[int]], odd_turn: bool, rules: "T3Rules", act: "T3Action",
+                      count: bool) -> tuple[float, Optional[SearchStats]]:
+    """
+    ParallelSearch task: scores one root move against the shared bound and raises
+    the bound if the move beats it.
+    
+    Parameters:
+        board (list[list[int]]):
+            The root board
+        odd_turn (bool):
+            Whether the odd player moves at the root
+        rules (T3Rules):
+            The rules the root is played under
+        act (T3Action):
+            The root move to search
+        count (bool):
+            Whether to collect SearchStats for the task
+    
+    Returns:
+        tuple[float, Optional[SearchStats]]:
+            The move's score as returned by _root_score, and the task's counters
+    """
+    state = T3State(odd_turn, board, rules)
+    stats = SearchStats(root_open=state._open) if count else None
+    score = _root_score(state, act, _shared_bound.value, GAME_TABLE, stats)
+    with _shared_bound.get_lock():
+        if score > _shared_bound.value: _shared_bound.value = score
+    return (score, stats)
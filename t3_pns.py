@@ -0,0 +1,364 @@
+"""
+Depth-first proof-number (df-pn) solver for T3: proves the game-theoretic outcome
+of positions far too big for alphabeta to solve, such as the empty 4x4 board,
+within a bounded node table that can be checkpointed to disk and resumed, and
+exports what it proves as transposition table bounds for the T3Player.
+
+Usage:
+    python t3_pns.py [--size 4] [--capacity 2000000] [--checkpoint PATH]
+                     [--every 1000000]
+"""
+from dataclasses import *
+from typing import *
+from t3_player import *
+import argparse
+import os
+import struct
+import sys
+import time
+
+"Valeria Sanz Jones"
+
+# Proof / disproof number of a solved node (and the cap of every sum)
+INF = 0xFFFFFFFF
+# Version of the checkpoint format, bumped whenever the layout changes
+VERSION = 1
+
+# Checkpoint header: magic, format version, board size, MAX_MOVE, WIN_TARGET, phase,
+# each phase's result (0 unknown, 1 proven, 2 disproven), root turn, nodes searched,
+# entries of each phase's table
+_HEADER = struct.Struct("<4sBBBBBBBBQII")
+_MAGIC = b"T3PN"
+# Table record after the key: proof number, disproof number, work
+_RECORD = struct.Struct("<III")
+
+Key = tuple[tuple[int, ...], bool]
+
+@dataclass
+class Proof:
+    """
+    The solved outcome of a position.
+    """
+    
+    # "win", "loss" or "draw", for the player to move at the root
+    outcome: str
+    # The earliest (T3Action order) move proven to achieve the outcome; None for a
+    # loss, where every move loses
+    move: Optional["T3Action"]
+    # Nodes searched to prove it, over every run resumed from a checkpoint
+    nodes: int
+
+class _Pause(Exception):
+    """
+    Raised inside a search whose node budget ran out, unwinding it to solve.
+    """
+
+class PNSolver:
+    """
+    Solves a position in two df-pn searches over boolean goals: whether the player
+    to move can force a win (if so, a win), and otherwise whether the opponent can
+    (a loss if so, a draw if not). Each search keeps, per canonical_key, a node's
+    proof and disproof numbers and the work spent on it; when a table outgrows its
+    capacity, the entries of least work are dropped, unsolved ones first. Searches
+    only try candidate_actions, which never loses anything a full move list has.
+    """
+    
+    def __init__(self, state: "T3State", capacity: int = 2_000_000):
+        """
+        Parameters:
+            state (T3State):
+                The (non-terminal) position to solve
+            capacity (int):
+                The most entries kept in either phase's table
+        """
+        self.root = state.copy()
+        self.capacity = capacity
+        self.nodes: int = 0
+        # Phase 0 proves a win for the root mover, phase 1 a win for the opponent;
+        # each phase's result, once known
+        self._phase = 0
+        self._results: list[Optional[bool]] = [None, None]
+        self._tables: list[dict[Key, list[int]]] = [{}, {}]
+        self._budget: Optional[int] = None
+    
+    def _target(self, phase: int) -> bool:
+        """
+        Returns:
+            bool:
+                Whether the given phase proves a win for the odd player
+        """
+        return self.root._odd_turn == (phase == 0)
+    
+    def solve(self, max_nodes: Optional[int] = None, checkpoint: Optional[str] = None,
+              every: int = 1_000_000, verbose: bool = False) -> Optional[Proof]:
+        """
+        Searches until the root is solved or max_nodes more nodes were searched.
+        
+        Parameters:
+            max_nodes (Optional[int]):
+                The most nodes to search in this call; None for no limit
+            checkpoint (Optional[str]):
+                Where to save the solver every `every` nodes (and when done)
+            every (int):
+                Nodes searched between checkpoints / progress reports
+            verbose (bool):
+                Whether to print progress to stderr
+        
+        Returns:
+            Optional[Proof]:
+                The proof, or None if the node limit was reached first
+        """
+        start = time.monotonic()
+        limit = None if max_nodes is None else self.nodes + max_nodes
+        while self._phase < 2:
+            if limit is not None and self.nodes >= limit: return None
+            table = self._tables[self._phase]
+            self._budget = every if limit is None else min(every, limit - self.nodes)
+            try:
+                result = self._prove(self.root, table, self._target(self._phase))
+            except _Pause:
+                result = None
+            finally:
+                self._budget = None
+            if result is not None:
+                self._results[self._phase] = result
+                # A win needs no second phase
+                self._phase = 2 if self._phase == 1 or result else 1
+            if verbose:
+                pn, dn, _ = table.get(self.root.canonical_key(), [1, 1, 0])
+                print("[...] " + str(self.nodes) + " nodes, root pn=" + str(pn) + " dn=" + str(dn) + ", " +
+                      str(len(table)) + " entries (" + str(round(time.monotonic() - start)) + "s)", file=sys.stderr)
+            if checkpoint is not None: self.save(checkpoint)
+        return self._proof()
+    
+    def _prove(self, state: "T3State", table: dict[Key, list[int]], target: bool) -> Optional[bool]:
+        """
+        Runs df-pn from state until it is solved (or the budget runs out).
+        
+        Returns:
+            Optional[bool]:
+                Whether target (the odd player if True) can force a win from state
+        
+        [!] Raises a _Pause when the node budget runs out
+        """
+        known = self._known(state, table, target)
+        if known is not None: return known
+        self._search(state, INF, INF, table, target)
+        return self._known(state, table, target)
+    
+    def _known(self, state: "T3State", table: dict[Key, list[int]], target: bool) -> Optional[bool]:
+        """
+        Returns:
+            Optional[bool]:
+                Whether target wins from state, if already decided: at a terminal,
+                when the player to move can win at once, or by the table
+        """
+        status = self._status(state, target)
+        if status is not None: return status
+        entry = table.get(state.canonical_key())
+        if entry is None or (entry[0] and entry[1]): return None
+        return entry[0] == 0
+    
+    def _status(self, state: "T3State", target: bool) -> Optional[bool]:
+        """
+        Returns:
+            Optional[bool]:
+                Whether target wins from state, if decided without a search: at a
+                terminal, or when the player to move can win at once
+        """
+        if state.is_win(): return state._odd_turn != target
+        if state.is_tie(): return False
+        if state.get_threats(): return state._odd_turn == target
+        return None
+    
+    def _search(self, state: "T3State", thpn: int, thdn: int, table: dict[Key, list[int]], target: bool) -> None:
+        """
+        The df-pn multiple iterative deepening step: expands below state (a node
+        undecided by _status) until its proof number reaches thpn or its disproof
+        number reaches thdn, then records its numbers in the table.
+        """
+        if self._budget is not None:
+            if self._budget <= 0: raise _Pause()
+            self._budget -= 1
+        self.nodes += 1
+        first = self.nodes
+        or_node = state._odd_turn == target
+        key = state.canonical_key()
+        actions = candidate_actions(state)
+        keys: list[Key] = []
+        fixed: list[Optional[tuple[int, int]]] = []
+        for act in actions:
+            state.apply(act)
+            status = self._status(state, target)
+            keys.append(state.canonical_key())
+            fixed.append(None if status is None else (0, INF) if status else (INF, 0))
+            state.undo(act)
+        # The side of the numbers this node minimizes over its children
+        side = 0 if or_node else 1
+        while True:
+            numbers: list[tuple[int, int]] = []
+            for child, fix in zip(keys, fixed):
+                if fix is None:
+                    entry = table.get(child)
+                    fix = (1, 1) if entry is None else (entry[0], entry[1])
+                numbers.append(fix)
+            least = min(n[side] for n in numbers)
+            total = min(INF, sum(n[1 - side] for n in numbers))
+            pn, dn = (least, total) if or_node else (total, least)
+            if pn >= thpn or dn >= thdn: break
+            # Descend into the most proving child, with thresholds that bring the
+            # search back as soon as the second best becomes better
+            order = sorted(range(len(numbers)), key=lambda i: numbers[i][side])
+            best = order[0]
+            second = numbers[order[1]][side] if len(order) > 1 else INF
+            if or_node:
+                child_pn, child_dn = min(thpn, second + 1), thdn - dn + numbers[best][1]
+            else:
+                child_pn, child_dn = thpn - pn + numbers[best][0], min(thdn, second + 1)
+            state.apply(actions[best])
+            try:
+                self._search(state, child_pn, child_dn, table, target)
+            finally:
+                state.undo(actions[best])
+        work = table.get(key, [0, 0, 0])[2] + self.nodes - first + 1
+        table[key] = [pn, dn, min(work, INF)]
+        if len(table) > self.capacity: self._collect(table)
+    
+    def _collect(self, table: dict[Key, list[int]]) -> None:
+        """
+        Shrinks a table to three quarters of its capacity, keeping solved entries
+        first and then those that took the most work to compute.
+        """
+        ranked = sorted(table, key=lambda k: (table[k][0] == 0 or table[k][1] == 0, table[k][2]))
+        for key in ranked[:len(table) - self.capacity * 3 // 4]:
+            del table[key]
+    
+    def _proof(self) -> Proof:
+        """
+        Builds the Proof of a solved root, finding its proven move: the earliest
+        one whose child is known to keep the outcome, re-proving children (dropped
+        by _collect) in T3Action order only if none is.
+        """
+        if self._results[0]:
+            outcome, phase = "win", 0
+        elif self._results[1]:
+            return Proof("loss", None, self.nodes)
+        else:
+            outcome, phase = "draw", 1
+        # A win must be proven won for the mover, a draw disproven for the opponent
+        wanted, root = phase == 0, self.root.copy()
+        table, target = self._tables[phase], self._target(phase)
+        actions = sorted(root.get_threats() or candidate_actions(root))
+        for prove in (False, True):
+            for act in actions:
+                root.apply(act)
+                result = self._prove(root, table, target) if prove else self._known(root, table, target)
+                root.undo(act)
+                if result == wanted: return Proof(outcome, act, self.nodes)
+        raise RuntimeError("[X] Solved root without a proven move")
+    
+    def export(self, table: "TranspositionTable") -> int:
+        """
+        Stores what the solver proved into a transposition table, as bounds on the
+        positions' values (evens maximizing) searched to the end: a proven win is at
+        least 1 for its winner, a disproven one at most 0, and a position neither
+        side can win is an exact 0. Positions the table already has are skipped.
+        
+        Parameters:
+            table (TranspositionTable):
+                The table to fill, e.g., GAME_TABLE
+        
+        Returns:
+            int:
+                The number of positions stored
+        """
+        bounds: dict[Key, list[Optional[bool]]] = {}
+        for phase in (0, 1):
+            for key, (pn, dn, _) in self._tables[phase].items():
+                if pn and dn: continue
+                bounds.setdefault(key, [None, None])[self._target(phase)] = pn == 0
+        stored, rules = 0, self.root._rules.key()
+        for (board, odd_turn), (even_wins, odd_wins) in bounds.items():
+            open_tiles = board.count(0)
+            tt_key = (board, odd_turn, rules)
+            if table.probe(tt_key) is not None: continue
+            if odd_wins is False and even_wins is False: table.store(tt_key, 0.0, EXACT, open_tiles, open_tiles)
+            elif even_wins: table.store(tt_key, 1.0, LOWER, open_tiles, open_tiles)
+            elif odd_wins: table.store(tt_key, -1.0, UPPER, open_tiles, open_tiles)
+            elif even_wins is False: table.store(tt_key, 0.0, UPPER, open_tiles, open_tiles)
+            else: table.store(tt_key, 0.0, LOWER, open_tiles, open_tiles)
+            stored += 1
+        return stored
+    
+    def save(self, path: str) -> None:
+        """
+        Writes the solver's progress to a checkpoint file (atomically, through a
+        temporary file, so an interruption never leaves a broken checkpoint).
+        
+        Parameters:
+            path (str):
+                Where to write the checkpoint
+        """
+        rules = self.root._rules
+        results = [0 if result is None else 1 if result else 2 for result in self._results]
+        with open(path + ".tmp", "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, VERSION, rules.size, rules.max_move, rules.win_target, self._phase,
+                                 *results, self.root._odd_turn, self.nodes, len(self._tables[0]), len(self._tables[1])))
+            f.write(bytes(self.root._cells))
+            for table in self._tables:
+                for (cells, odd_turn), (pn, dn, work) in table.items():
+                    f.write(bytes(cells) + bytes([odd_turn]) + _RECORD.pack(pn, dn, min(work, INF)))
+        os.replace(path + ".tmp", path)
+    
+    @classmethod
+    def load(cls, path: str, capacity: int = 2_000_000) -> "PNSolver":
+        """
+        Resumes a solver from a checkpoint written by save.
+        
+        Parameters:
+            path (str):
+                The checkpoint file
+            capacity (int):
+                The most entries kept in either phase's table
+        
+        Returns:
+            PNSolver:
+                The solver, ready to continue with solve
+        
+        [!] Raises a ValueError if the file is not a checkpoint of this VERSION
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, size, max_move, win_target, phase, first, second, odd_turn, nodes, *counts = \
+            _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != VERSION:
+            raise ValueError("[X] " + path + " is not a version " + str(VERSION) + " T3 df-pn checkpoint")
+        cells, offset = size * size, _HEADER.size
+        board = list(data[offset:offset + cells])
+        rules = get_rules(size, max_move, win_target)
+        solver = cls(T3State(bool(odd_turn), [board[r * size:(r + 1) * size] for r in range(size)], rules), capacity)
+        solver.nodes, solver._phase = nodes, phase
+        solver._results = [None if result == 0 else result == 1 for result in (first, second)]
+        offset += cells
+        for table, count in zip(solver._tables, counts):
+            for _ in range(count):
+                key = (tuple(data[offset:offset + cells]), bool(data[offset + cells]))
+                table[key] = list(_RECORD.unpack_from(data, offset + cells + 1))
+                offset += cells + 1 + _RECORD.size
+        return solver
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prove the outcome of an empty T3 board by df-pn.")
+    parser.add_argument("--size", type=int, default=4, help="side length of the board (default 4)")
+    parser.add_argument("--evens", action="store_true", help="have evens move first")
+    parser.add_argument("--capacity", type=int, default=2_000_000, help="table entries kept per phase")
+    parser.add_argument("--checkpoint", help="checkpoint file, resumed from if it exists")
+    parser.add_argument("--every", type=int, default=1_000_000, help="nodes between checkpoints")
+    args = parser.parse_args()
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        solver = PNSolver.load(args.checkpoint, args.capacity)
+    else:
+        solver = PNSolver(T3State(not args.evens, [[0] * args.size for _ in range(args.size)]), args.capacity)
+    proof = cast(Proof, solver.solve(checkpoint=args.checkpoint, every=args.every, verbose=True))
+    print("[!] " + ("Odds" if solver.root._odd_turn else "Evens") + " to move: " + proof.outcome +
+          (", e.g., with " + str(proof.move) if proof.move is not None else "") + " (" + str(proof.nodes) + " nodes)")
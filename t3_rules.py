@@ -0,0 +1,236 @@
+from typing import *
+from t3_action import *
+import functools
+import random
+
+"Valeria Sanz Jones"
+
+class T3Rules:
+    """
+    A T3 rule variant, viz., the board's side length, the numbers the players
+    place (odds all odd numbers from 1 to max_move inclusive, evens all even ones)
+    and the sum along a row, column, or diagonal that wins, together with the lookup
+    tables that T3States of the variant share. Built once per variant by get_rules,
+    so every state of a variant references the same tables, and states of several
+    variants can coexist in one process.
+    
+    Tables (cells are row-major flat indices; lines are the rows 0..size-1, the
+    columns size..2*size-1, then the main diagonal 2*size and the anti-diagonal):
+        cell_lines[idx]:       the lines through a cell
+        line_cells[line]:      the cells on a line
+        tiles:                 every cell's (col, row, idx), in T3Action order
+        odd_moves, even_moves: each player's numbers, ascending
+        actions[odd][idx]:     the odd (True) or even (False) player's interned
+                               T3Actions on a cell, in T3Action order
+        completions[odd][sum]: the number with which the odd (True) or even
+                               (False) player brings a line of the given partial
+                               sum to win_target, or 0 if there is none
+        zobrist[idx][number]:  the 64-bit Zobrist key of a number on a cell (0 for
+                               an empty cell)
+        symmetries:            the 8 symmetries of the board (see symmetries)
+    """
+    
+    __slots__ = ("size", "max_move", "win_target", "cell_lines", "line_cells", "tiles", "odd_moves", "even_moves",
+                 "actions", "completions", "zobrist", "symmetries")
+    
+    def __init__(self, size: int, max_move: int, win_target: int):
+        """
+        Precomputes the tables of a variant; use get_rules for the shared instance.
+        
+        Parameters:
+            size (int):
+                The side length of the square board
+            max_move (int):
+                The largest number that may be placed on the board
+            win_target (int):
+                The line sum that constitutes a win
+        """
+        if size < 1 or max_move < 1: raise ValueError("[X] Invalid T3 rules " + str((size, max_move, win_target)))
+        self.size = size
+        self.max_move = max_move
+        self.win_target = win_target
+        self.cell_lines: tuple[tuple[int, ...], ...] = _cell_lines(size)
+        self.line_cells: tuple[tuple[int, ...], ...] = _line_cells(size)
+        self.tiles: tuple[tuple[int, int, int], ...] = tuple((c, r, r * size + c) for c in range(size) for r in range(size))
+        self.odd_moves: tuple[int, ...] = tuple(range(1, max_move + 1, 2))
+        self.even_moves: tuple[int, ...] = tuple(range(2, max_move + 1, 2))
+        self.actions: tuple[tuple[tuple[T3Action, ...], ...], ...] = tuple(
+            tuple(tuple([T3Action(idx % size, idx // size, move) for move in moves]) for idx in range(size * size))
+            for moves in (self.even_moves, self.odd_moves))
+        # No line sums to more than size * max_move
+        evens, odds = [], []
+        for partial in range(size * max_move + 1):
+            need = win_target - partial
+            valid = 0 < need <= max_move
+            evens.append(need if valid and need % 2 == 0 else 0)
+            odds.append(need if valid and need % 2 == 1 else 0)
+        self.completions: tuple[tuple[int, ...], tuple[int, ...]] = (tuple(evens), tuple(odds))
+        self.zobrist: tuple[tuple[int, ...], ...] = _zobrist_keys(size, max_move)
+        self.symmetries: tuple[tuple[int, ...], ...] = symmetries(size)
+    
+    def moves(self, odd_turn: bool) -> tuple[int, ...]:
+        """
+        Returns:
+            tuple[int, ...]:
+                The numbers the odd (True) or even (False) player may place
+        """
+        return self.odd_moves if odd_turn else self.even_moves
+    
+    def action(self, idx: int, move: int) -> T3Action:
+        """
+        Parameters:
+            idx (int):
+                The row-major flat index of a cell
+            move (int):
+                A number either player may place
+        
+        Returns:
+            T3Action:
+                The interned action placing the number on the cell
+        """
+        return self.actions[move % 2][idx][(move - 1) // 2]
+    
+    def key(self) -> tuple[int, int, int]:
+        """
+        Returns:
+            tuple[int, int, int]:
+                The (size, max_move, win_target) that identify the variant
+        """
+        return (self.size, self.max_move, self.win_target)
+    
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, T3Rules) and self.key() == other.key()
+    
+    def __hash__(self) -> int:
+        return hash(self.key())
+    
+    def __repr__(self) -> str:
+        return "T3Rules(size=" + str(self.size) + ", max_move=" + str(self.max_move) + \
+               ", win_target=" + str(self.win_target) + ")"
+    
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Unpickled (e.g., in worker processes) as that process's shared instance
+        return (get_rules, self.key())
+
+@functools.lru_cache(maxsize=None)
+def get_rules(size: int, max_move: int, win_target: int) -> T3Rules:
+    """
+    Returns the shared T3Rules of a variant, building its tables on first use.
+    
+    Parameters:
+        size (int):
+            The side length of the square board
+        max_move (int):
+            The largest number that may be placed on the board
+        win_target (int):
+            The line sum that constitutes a win
+    
+    Returns:
+        T3Rules:
+            The variant's rules, the same instance on every call
+    """
+    return T3Rules(size, max_move, win_target)
+
+
+@functools.lru_cache(maxsize=None)
+def _zobrist_keys(size: int, max_move: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Returns the random 64-bit Zobrist keys of a size x size board, one per cell per
+    number that can occupy it; the key of an empty (0) cell is 0 so that a board's
+    hash is the XOR of the keys of its filled tiles. Keys are seeded by the board
+    geometry, so hashes are reproducible across runs and processes.
+    
+    Parameters:
+        size (int):
+            The side length of the square board
+        max_move (int):
+            The largest number that may be placed on the board
+    
+    Returns:
+        tuple[tuple[int, ...], ...]:
+            keys[idx][number] for every row-major flat index idx
+    """
+    rng = random.Random(size * 1000 + max_move)
+    return tuple(tuple([0] + [rng.getrandbits(64) for _ in range(max_move)]) for _ in range(size * size))
+
+
+@functools.lru_cache(maxsize=None)
+def _cell_lines(size: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Returns, for each row-major flat index of a size x size board, the indices of
+    the lines through that cell: rows are 0..size-1, columns size..2*size-1, then
+    the main diagonal 2*size and the anti-diagonal 2*size+1.
+    
+    Parameters:
+        size (int):
+            The side length of the square board
+    
+    Returns:
+        tuple[tuple[int, ...], ...]:
+            The line indices of every cell
+    """
+    lines = []
+    for r in range(size):
+        for c in range(size):
+            cell = [r, size + c]
+            if r == c: cell.append(2 * size)
+            if r + c == size - 1: cell.append(2 * size + 1)
+            lines.append(tuple(cell))
+    return tuple(lines)
+
+
+@functools.lru_cache(maxsize=None)
+def _line_cells(size: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Returns, for each line of a size x size board (numbered as in _cell_lines),
+    the row-major flat indices of the cells on it.
+    
+    Parameters:
+        size (int):
+            The side length of the square board
+    
+    Returns:
+        tuple[tuple[int, ...], ...]:
+            The cell indices of every line
+    """
+    lines: list[list[int]] = [[] for _ in range(2 * size + 2)]
+    for idx, through in enumerate(_cell_lines(size)):
+        for line in through:
+            lines[line].append(idx)
+    return tuple(tuple(cells) for cells in lines)
+
+
+@functools.lru_cache(maxsize=None)
+def symmetries(size: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Returns the 8 symmetries of a size x size board (the dihedral group D4) as
+    permutations of row-major flat indices, such that image[i] = flat[perm[i]].
+    
+    Parameters:
+        size (int):
+            The side length of the square board
+    
+    Returns:
+        tuple[tuple[int, ...], ...]:
+            The 8 index permutations, the identity first
+    """
+    n = size - 1
+    maps: list[Callable[[int, int], tuple[int, int]]] = [
+        lambda r, c: (r, c),
+        lambda r, c: (c, n - r),
+        lambda r, c: (n - r, n - c),
+        lambda r, c: (n - c, r),
+        lambda r, c: (r, n - c),
+        lambda r, c: (n - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (n - c, n - r),
+    ]
+    perms = []
+    for f in maps:
+        perm = [0] * (size * size)
+        for r in range(size):
+            for c in range(size):
+                sr, sc = f(r, c)
+                perm[r * size + c] = sr * size + sc
+        perms.append(tuple(perm))
+    return tuple(perms)
@@ -0,0 +1,340 @@
+"""
+Asyncio game server for T3: hosts many concurrent human-vs-AI sessions over a
+JSON-lines protocol on a local socket, running the AI's searches in a bounded
+executor so that a slow search never blocks the other sessions.
+
+Protocol (one JSON object per line each way; every reply has "ok"):
+    {"op": "new", "board": [[...]], "odds_starts": true, "player_odds": true}
+        -> {"ok": true, "session": ID, ...} and the AI's first move if it starts
+    {"op": "move", "session": ID, "col": C, "row": R, "move": M}
+        -> the player's move is applied and the AI replies with its own
+    {"op": "ai", "session": ID}    -> asks the AI to move (e.g., after a timeout)
+    {"op": "state", "session": ID} -> the current board and status
+    {"op": "close", "session": ID} -> ends the session
+Errors reply {"ok": false, "error": "..."}; "busy" and "timeout" may be retried.
+
+Usage:
+    python t3_server.py [--host 127.0.0.1] [--port 7333] [--workers 2]
+                        [--think-time 1.0] [--timeout 10] [--max-queue 16]
+                        [--store PATH]
+"""
+from dataclasses import *
+from typing import *
+from t3_player import *
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import t3_player
+import threading
+import time
+
+"Valeria Sanz Jones"
+
+# Port the server listens on unless told otherwise
+DEFAULT_PORT = 7333
+# Byte budget of each executor worker's transposition table
+WORKER_TABLE_BYTES = 16 << 20
+
+@dataclass
+class Session:
+    """
+    One game in progress: its state, which side the human plays, and a lock so
+    that a session's requests are handled one at a time.
+    """
+    
+    state: "T3State"
+    player_odds: bool
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+class RequestError(Exception):
+    """
+    A request that cannot be served; its message is sent back as the "error".
+    """
+
+class T3Server:
+    """
+    The session registry and request handling of the game server. AI moves run in
+    an executor of at most workers searches at once; when those are all busy, up
+    to max_queue more wait for a turn and any beyond that are turned away as
+    "busy" (backpressure), and every search must finish within timeout seconds.
+    """
+    
+    def __init__(self, workers: int = 2, think_time: Optional[float] = 1.0, timeout: float = 10.0,
+                 max_queue: int = 16, processes: bool = True, store: Optional[str] = None):
+        """
+        Parameters:
+            workers (int):
+                Number of searches that may run at once
+            think_time (Optional[float]):
+                Seconds the AI may think per move, or None to search the whole
+                game tree
+            timeout (float):
+                Seconds a request may wait for its AI move, queueing included
+            max_queue (int):
+                Number of AI requests that may wait for a free worker
+            processes (bool):
+                Whether to search in worker processes (which scale across CPUs)
+                rather than threads
+            store (Optional[str]):
+                The solved-position store the workers share (see t3_store), if any
+        """
+        self._executor: concurrent.futures.Executor = (
+            concurrent.futures.ProcessPoolExecutor(workers, initializer=_use_store, initargs=(store,)) if processes else
+            concurrent.futures.ThreadPoolExecutor(workers, initializer=_use_store, initargs=(store,)))
+        self._slots = asyncio.Semaphore(workers)
+        self._capacity = workers + max_queue
+        self._pending = 0
+        self._think_time = think_time
+        self._timeout = timeout
+        self._sessions: dict[int, Session] = {}
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.Server] = None
+    
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> int:
+        """
+        Starts listening for connections.
+        
+        Returns:
+            int:
+                The port listened on (useful when port 0 picks a free one)
+        """
+        self._server = await asyncio.start_server(self._serve_client, host, port)
+        return cast(int, self._server.sockets[0].getsockname()[1])
+    
+    async def close(self) -> None:
+        """
+        Stops listening and shuts the executor down.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one connection, a request at a time: the next line is not read until
+        the reply to the last one has been flushed, so that a client that does not
+        read its replies is slowed down by TCP flow control rather than buffered.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict): raise RequestError("request must be an object")
+                    reply = await self.handle(request)
+                except (RequestError, ValueError, TypeError, KeyError, OverflowError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(reply, separators=(",", ":")) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+    
+    async def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Serves one request.
+        
+        Parameters:
+            request (dict[str, Any]):
+                The parsed request line
+        
+        Returns:
+            dict[str, Any]:
+                The reply
+        
+        [!] Raises a RequestError (or ValueError, TypeError, KeyError for malformed
+        fields) for requests that cannot be served
+        """
+        op = request.get("op")
+        if op == "new":
+            state = T3State(bool(request.get("odds_starts", True)), _board(request.get("board")))
+            new_id = next(self._ids)
+            session = Session(state, bool(request.get("player_odds", True)))
+            self._sessions[new_id] = session
+            async with session.lock:
+                return await self._play(new_id, session)
+        session_id = request.get("session")
+        if not isinstance(session_id, int) or session_id not in self._sessions:
+            raise RequestError("unknown session")
+        session = self._sessions[session_id]
+        if op == "close":
+            del self._sessions[session_id]
+            return {"ok": True}
+        async with session.lock:
+            if op == "state":
+                return self._reply(session_id, session, None)
+            if op not in ("move", "ai"): raise RequestError("unknown op " + str(op))
+            if _over(session.state): raise RequestError("game over")
+            if op == "move":
+                if session.state._odd_turn != session.player_odds: raise RequestError("not your turn")
+                act = T3Action(int(request["col"]), int(request["row"]), int(request["move"]))
+                if not session.state.is_valid_action(act): raise RequestError("invalid action")
+                session.state.apply(act)
+            elif session.state._odd_turn == session.player_odds:
+                raise RequestError("not the AI's turn")
+            return await self._play(session_id, session)
+    
+    async def _play(self, session_id: int, session: Session) -> dict[str, Any]:
+        """
+        Lets the AI move if it is its turn, and builds the reply describing the
+        session; a failed AI move replies with the error along with the session,
+        whose state is still as the request left it.
+        """
+        state = session.state
+        ai = None
+        if not _over(state) and state._odd_turn != session.player_odds:
+            try:
+                ai = await self._ai_turn(session)
+            except RequestError as e:
+                return {**self._reply(session_id, session, None), "ok": False, "error": str(e)}
+        return self._reply(session_id, session, ai)
+    
+    async def _ai_turn(self, session: Session) -> "T3Action":
+        """
+        Searches for and plays the AI's move in a session, in the executor.
+        
+        [!] Raises a RequestError if the executor is saturated, the search does
+        not finish within the timeout, or it fails (e.g. a worker process died);
+        the session is then left unchanged
+        """
+        if self._pending >= self._capacity: raise RequestError("busy")
+        self._pending += 1
+        try:
+            async with asyncio.timeout(self._timeout):
+                await self._slots.acquire()
+                try:
+                    future = asyncio.get_running_loop().run_in_executor(
+                        self._executor, _ai_move, session.state.board(), session.state._odd_turn, self._think_time)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                # A search cannot be interrupted, so its slot is only freed once it
+                # is done, even if this request has timed out by then
+                future.add_done_callback(lambda _: self._slots.release())
+                move = await asyncio.shield(future)
+        except TimeoutError:
+            raise RequestError("timeout")
+        except Exception as e:
+            # Whatever the executor raised (a broken process pool, a shut down
+            # executor, an error in the search) fails this request, not the connection
+            raise RequestError("search failed: " + type(e).__name__) from e
+        finally:
+            self._pending -= 1
+        act = T3Action(*move)
+        session.state.apply(act)
+        return act
+    
+    def _reply(self, session_id: int, session: Session, ai: Optional["T3Action"]) -> dict[str, Any]:
+        """
+        Builds the reply describing a session after a request.
+        """
+        state = session.state
+        reply: dict[str, Any] = {"ok": True, "session": session_id, "board": state.board(),
+                                 "turn": "odd" if state._odd_turn else "even", "status": _status(state)}
+        if ai is not None: reply["ai"] = [ai.col(), ai.row(), ai.move()]
+        return reply
+
+def _board(raw: Any) -> Optional[list[list[int]]]:
+    """
+    Returns:
+        Optional[list[list[int]]]:
+            The board of a "new" request, or None for the default one
+    
+    [!] Raises a RequestError unless the board is a square grid of integers from 0
+    to T3State.MAX_MOVE
+    """
+    if raw is None: return None
+    if not isinstance(raw, list) or not raw or \
+       not all(isinstance(row, list) and len(row) == len(raw) for row in raw):
+        raise RequestError("board must be a square grid")
+    if not all(type(cell) is int and 0 <= cell <= T3State.MAX_MOVE for row in raw for cell in row):
+        raise RequestError("board cells must be integers from 0 to " + str(T3State.MAX_MOVE))
+    return raw
+
+def _over(state: "T3State") -> bool:
+    return state.is_win() or state.is_tie()
+
+def _status(state: "T3State") -> str:
+    """
+    Returns:
+        str:
+            "playing", "tie", or which player won: "odd wins" / "even wins"
+    """
+    if state.is_tie(): return "tie"
+    if state.is_win(): return "even wins" if state._odd_turn else "odd wins"
+    return "playing"
+
+# Each executor thread's transposition table and move ordering (see _worker_table)
+_worker = threading.local()
+
+def _worker_table() -> "BoundedTable":
+    """
+    Returns:
+        BoundedTable:
+            The calling worker's table, of WORKER_TABLE_BYTES: workers outlive the
+            games they search, so their tables keep results across moves (and
+            games) without growing, and no two threads ever share one
+    """
+    table = getattr(_worker, "table", None)
+    if table is None: table = _worker.table = BoundedTable(WORKER_TABLE_BYTES)
+    return cast(BoundedTable, table)
+
+def _worker_ordering() -> "MoveOrdering":
+    """
+    Returns:
+        MoveOrdering:
+            The calling worker's move ordering, which (like its table) persists
+            across the moves it searches rather than being shared with other threads
+    """
+    ordering = getattr(_worker, "ordering", None)
+    if ordering is None: ordering = _worker.ordering = MoveOrdering()
+    return cast(MoveOrdering, ordering)
+
+def _ai_move(board: list[list[int]], odd_turn: bool, think_time: Optional[float]) -> tuple[int, int, int]:
+    """
+    Executor task: chooses the AI's move, as (col, row, move) so that it pickles
+    cheaply back from worker processes.
+    """
+    deadline = time.monotonic() + think_time if think_time is not None else None
+    act = cast(T3Action, choose(T3State(odd_turn, board), _worker_table(),
+                                   deadline=deadline, ordering=_worker_ordering()))
+    return (act.col(), act.row(), act.move())
+
+def _use_store(path: Optional[str]) -> None:
+    """
+    Executor initializer: points the worker's choose at the solved-position store.
+    """
+    if path is not None: t3_player.STORE_PATH = path
+
+async def serve(host: str, port: int, **options: Any) -> None:
+    """
+    Runs a T3Server until cancelled.
+    """
+    server = T3Server(**options)
+    bound = await server.start(host, port)
+    print("[!] T3 server listening on " + host + ":" + str(bound))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve T3 games over a JSON-lines socket protocol.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=2, help="concurrent AI searches (default 2)")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds per AI move (default 1.0)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per AI request (default 10)")
+    parser.add_argument("--max-queue", type=int, default=16, help="AI requests that may wait (default 16)")
+    parser.add_argument("--store", default=None, help="solved-position database shared by the workers")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, think_time=args.think_time,
+                          timeout=args.timeout, max_queue=args.max_queue, store=args.store))
+    except KeyboardInterrupt:
+        pass
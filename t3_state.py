@@ -1,8 +1,8 @@
 from dataclasses import *
 from typing import *
 from t3_action import *
-import copy
-import itertools
+from t3_rules import *
+from array import array
 
 "Valeria Sanz Jones"
 
@@ -12,8 +12,22 @@ class T3State:
     Representation of the T3 grid board-state, which player's turn (odds / evens),
     and ability to obtain the actions and transitions possible (among other state
     utility methods).
+    
+    The board is held as a flat, row-major array of bytes so that states are cheap
+    to copy and can be stepped in place with apply / undo during search. Alongside
+    it, the sum and number of filled tiles of every line (rows, then columns, then
+    the two diagonals) are kept up to date, as are the open tile count and the
+    number of lines that hit WIN_TARGET, so is_win / is_tie are O(1). A 64-bit
+    Zobrist hash of the board and turn is likewise updated on every move.
+    
+    The geometry, move sets and win target come from the state's T3Rules, whose
+    precomputed tables all states of the same variant share; the class constants
+    below are only the rules of states constructed without explicit ones.
     """
     
+    __slots__ = ("_cells", "_rows", "_cols", "_odd_turn", "_rules", "_lines", "_sums", "_fills", "_open", "_wins",
+                 "_keys", "_hash")
+    
     # The maximum numerical move available to either player, though odds will get
     # all odds from 1 to MAX_MOVE (inclusive), and evens all even numbers
     MAX_MOVE = 6
@@ -22,7 +36,7 @@ class T3State:
     # The default size of the game board, though can be arbitrarily larger
     DEFAULT_SIZE = 3
     
-    def __init__(self, odd_turn: bool, state: Optional[list[list[int]]]):
+    def __init__(self, odd_turn: bool, state: Optional[list[list[int]]], rules: Optional[T3Rules] = None):
         """
         Constructs a new T3 Board State from either the one provided,
         or the default, which will be a 3x3 empty grid. Which players turn
@@ -34,14 +48,44 @@ class T3State:
                 therefore, it is the even player's)
             state (Optional[list[list[int]]]):
                 The board state, which must be a square N x N grid
+            rules (Optional[T3Rules]):
+                The rules of the game; by default, those of the class constants
+                for the board's size
+        
+        [!] Raises a ValueError if the board is not square, does not match the
+        rules' size, or holds a number outside 0 to the rules' max_move
         """
-        if state:
-            self._state: list[list[int]] = state 
-        else:
-            self._state = [[0]*T3State.DEFAULT_SIZE for x in range(T3State.DEFAULT_SIZE)]
-        self._rows: int = len(self._state)
-        self._cols: int = len(self._state[0])
+        if not state:
+            size = rules.size if rules is not None else T3State.DEFAULT_SIZE
+            state = [[0]*size for x in range(size)]
+        if any(len(row) != len(state) for row in state):
+            raise ValueError("[X] Board " + str(state) + " is not a square grid")
+        if rules is None:
+            rules = get_rules(len(state), T3State.MAX_MOVE, T3State.WIN_TARGET)
+        elif rules.size != len(state):
+            raise ValueError("[X] Board of size " + str(len(state)) + " does not match " + str(rules))
+        cells = [cell for row in state for cell in row]
+        if not all(0 <= cell <= rules.max_move for cell in cells):
+            raise ValueError("[X] Board " + str(state) + " holds numbers outside 0 to " + str(rules.max_move))
+        self._cells: array[int] = array("b", cells)
+        self._rows: int = len(state)
+        self._cols: int = len(state[0])
         self._odd_turn: bool = odd_turn
+        self._rules: T3Rules = rules
+        self._lines: tuple[tuple[int, ...], ...] = rules.cell_lines
+        self._sums: list[int] = [0] * (2 * self._cols + 2)
+        self._fills: list[int] = [0] * (2 * self._cols + 2)
+        for idx, cell in enumerate(self._cells):
+            if cell == 0: continue
+            for line in self._lines[idx]:
+                self._sums[line] += cell
+                self._fills[line] += 1
+        self._open: int = self._cells.count(0)
+        self._wins: int = self._sums.count(rules.win_target)
+        self._keys: tuple[tuple[int, ...], ...] = rules.zobrist
+        self._hash: int = _ZOBRIST_ODD_TURN if odd_turn else 0
+        for idx, cell in enumerate(self._cells):
+            self._hash ^= self._keys[idx][cell]
     
     def is_valid_action(self, act: "T3Action") -> bool:
         """
@@ -59,9 +103,8 @@ class T3State:
         """
         return act.col() >= 0 and act.col() < self._rows and \
                act.row() >= 0 and act.row() < self._cols and \
-               act.move() >= 0 and act.move() <= T3State.MAX_MOVE and \
-               act.move() % 2 == 1 if self._odd_turn else act.move() % 2 == 0 and \
-               self._state[act.row()][act.col()] == 0
+               act.move() in self._rules.moves(self._odd_turn) and \
+               self._cells[act.row() * self._cols + act.col()] == 0
     
     def get_next_state(self, act: Optional["T3Action"]) -> "T3State":
         """
@@ -83,9 +126,8 @@ class T3State:
         if act is None or not self.is_valid_action(act):
             raise ValueError("[X] Chosen action " + str(act) + " is invalid!")
         
-        next_state = copy.deepcopy(self)
-        next_state._state[act.row()][act.col()] = act.move()
-        next_state._odd_turn = not next_state._odd_turn
+        next_state = self.copy()
+        next_state.apply(act)
         return next_state
     
     def get_open_tiles(self) -> list[tuple[int, int]]:
@@ -98,8 +140,8 @@ class T3State:
             list[tuple[int, int]]:
                 The list of (c,r) tuples of all 0s / open tiles on the board.
         """
-        tile_pos = itertools.product(range(self._cols), range(self._rows))
-        return [(c, r) for (c, r) in tile_pos if self._state[r][c] == 0]
+        cells = self._cells
+        return [(c, r) for (c, r, idx) in self._rules.tiles if cells[idx] == 0]
     
     def get_moves(self) -> list[int]:
         """
@@ -114,9 +156,7 @@ class T3State:
             list[int]:
                 The list of int moves available to the player in any open tile.
         """
-        return [move for move in range(1, T3State.MAX_MOVE+1) if \
-                (self._odd_turn and move % 2 == 1) or \
-                (not self._odd_turn and move % 2 == 0)]
+        return list(self._rules.moves(self._odd_turn))
     
     def is_win(self) -> bool:
         """
@@ -130,11 +170,7 @@ class T3State:
             bool:
                 Whether or not the current state is a terminal win state.
         """
-        rows = [sum([self._state[i][j] for i in range(self._rows)]) for j in range(self._cols)]
-        cols = [sum([self._state[j][i] for i in range(self._cols)]) for j in range(self._rows)]
-        diag1 = [sum([self._state[x][x] for x in range(self._rows)])]
-        diag2 = [sum([self._state[x][self._cols - 1 - x] for x in range(self._rows)])]
-        return T3State.WIN_TARGET in (rows + cols + diag1 + diag2)
+        return self._wins > 0
     
     def is_tie(self) -> bool:
         """
@@ -145,18 +181,19 @@ class T3State:
             bool:
                 Whether or not the state is a tie.
         """
-        return not self.is_win() and not self.get_open_tiles()
+        return self._wins == 0 and self._open == 0
     
     def __str__(self) -> str:
-        return "\n".join([str(r) for r in self._state])
+        return "\n".join([str(r) for r in self.board()])
     
     def __eq__(self, other: Any) -> bool:
         if other is None: return False
         if not isinstance(other, T3State): return False
-        return self._state == other._state and self._odd_turn == other._odd_turn
+        if self._hash != other._hash: return False
+        return self._cells == other._cells and self._odd_turn == other._odd_turn and self._rules == other._rules
     
     def __hash__(self) -> int:
-        return hash((str(self._state), self._odd_turn))
+        return self._hash
     
     # DO NOT TOUCH ABOVE THIS LINE! Your work is below!
     # ---------------------------------------------------------------------------
@@ -201,7 +238,172 @@ class T3State:
             Iterator[tuple["T3Action", "T3State"]]:
                 A Generator of transition tuples of the format (T3Action, T3State)
         """
-        # [!] TODO! (delete these next 2 lines to start)
-        for cell in self.get_open_tiles():
-            for move in self.get_moves():
-                yield (T3Action(cell[0], cell[1], move), self.get_next_state(T3Action(cell[0], cell[1], move)))
\ No newline at end of file
+        # Children are only built as the generator is consumed, from the already
+        # legal actions of get_actions
+        for act in self.get_actions():
+            child = self.copy()
+            child.apply(act)
+            yield (act, child)
+    
+    def get_actions(self) -> Iterator["T3Action"]:
+        """
+        Returns a Generator of the legal actions from this state in the T3Action
+        tiebreaking order, without building any of the states they lead to; the
+        actions are the interned ones of the state's T3Rules, so none is allocated.
+        
+        Returns:
+            Iterator[T3Action]:
+                A Generator of every open tile x move combination
+        """
+        cells, actions = self._cells, self._rules.actions[self._odd_turn]
+        for (_, _, idx) in self._rules.tiles:
+            if not cells[idx]: yield from actions[idx]
+    
+    def apply(self, act: "T3Action") -> None:
+        """
+        Plays the given action on this state in place (the mutable counterpart of
+        get_next_state, for search). The action is not validated, and must be
+        reverted with undo before the state is used elsewhere.
+        
+        Parameters:
+            act (T3Action):
+                A legal action in this state
+        """
+        idx, move = act._row * self._cols + act._col, act._move
+        self._cells[idx] = move
+        self._place(idx, move, 1)
+        self._odd_turn = not self._odd_turn
+        self._hash ^= self._keys[idx][move] ^ _ZOBRIST_ODD_TURN
+    
+    def undo(self, act: "T3Action") -> None:
+        """
+        Reverts an action that was the last one applied to this state.
+        
+        Parameters:
+            act (T3Action):
+                The action passed to the matching apply call
+        """
+        idx = act._row * self._cols + act._col
+        move = self._cells[idx]
+        self._place(idx, -move, -1)
+        self._cells[idx] = 0
+        self._odd_turn = not self._odd_turn
+        self._hash ^= self._keys[idx][move] ^ _ZOBRIST_ODD_TURN
+    
+    def _place(self, idx: int, delta: int, filled: int) -> None:
+        """
+        Updates the running sums, fill counts, open tile and winning line counts of
+        the lines through one cell whose number changed by delta.
+        
+        Parameters:
+            idx (int):
+                The flat index of the changed cell
+            delta (int):
+                The number added to (positive) or removed from (negative) the cell
+            filled (int):
+                1 if the cell was filled, -1 if it was emptied
+        """
+        sums, fills, target = self._sums, self._fills, self._rules.win_target
+        for line in self._lines[idx]:
+            old = sums[line]
+            sums[line] = old + delta
+            fills[line] += filled
+            self._wins += (old + delta == target) - (old == target)
+        self._open -= filled
+    
+    def copy(self) -> "T3State":
+        """
+        Returns:
+            T3State:
+                An independent state with the same board and turn as this one
+        """
+        result = T3State.__new__(T3State)
+        result._cells = array("b", self._cells)
+        result._rows = self._rows
+        result._cols = self._cols
+        result._odd_turn = self._odd_turn
+        result._rules = self._rules
+        result._lines = self._lines
+        result._sums = self._sums[:]
+        result._fills = self._fills[:]
+        result._open = self._open
+        result._wins = self._wins
+        result._keys = self._keys
+        result._hash = self._hash
+        return result
+    
+    def board(self) -> list[list[int]]:
+        """
+        Returns:
+            list[list[int]]:
+                A fresh N x N grid (list of rows) of the numbers on the board
+        """
+        cells, n = self._cells, self._cols
+        return [cells[r * n:(r + 1) * n].tolist() for r in range(self._rows)]
+    
+    def rules(self) -> T3Rules:
+        """
+        Returns:
+            T3Rules:
+                The rules this state is played under
+        """
+        return self._rules
+    
+    def canonical_key(self) -> tuple[tuple[int, ...], bool]:
+        """
+        Returns a key that is shared by this state and all of its rotations and
+        reflections (the 8 symmetries of a square board), viz., the board mapped
+        to its smallest symmetric image (flattened row-major) together with whose
+        turn it is. Lines map onto lines under every such symmetry, so states with
+        equal keys always have equal minimax values.
+        
+        Returns:
+            tuple[tuple[int, ...], bool]:
+                The (smallest flattened symmetric image, odd_turn) tuple
+        """
+        flat = self._cells
+        image = min(tuple([flat[i] for i in perm]) for perm in self._rules.symmetries)
+        return (image, self._odd_turn)
+    
+    def get_threats(self, odd_turn: Optional[bool] = None) -> list["T3Action"]:
+        """
+        Returns the actions with which the given player would win at once, viz.,
+        for every line with an open tile, placing the one number that brings the
+        line's partial sum to WIN_TARGET on any of its open tiles, if that number
+        is among the player's moves. A line need not be one tile short of full for
+        this (e.g., 6 + 6 + 1 on a 4x4 board), so every line that is not full is
+        checked, each with one lookup in the rules' completions.
+        
+        Example:
+            [6, 4, 0]
+            [1, 0, 4]
+            [0, 0, 0]
+            
+            The odds player threatens T3Action(2, 0, 3) along the top row, and
+            the evens player T3Action(0, 2, 6) down the first column.
+        
+        Parameters:
+            odd_turn (Optional[bool]):
+                Whether to find the odd (True) or even (False) player's threats;
+                by default, those of the player whose turn it is
+        
+        Returns:
+            list[T3Action]:
+                The player's immediately winning actions, in T3Action order
+        """
+        if odd_turn is None: odd_turn = self._odd_turn
+        cells, n, sums = self._cells, self._cols, self._sums
+        rules = self._rules
+        completes, line_cells, actions = rules.completions[odd_turn], rules.line_cells, rules.actions[odd_turn]
+        threats = set()
+        for line, fill in enumerate(self._fills):
+            if fill == n: continue
+            need = completes[sums[line]]
+            if not need: continue
+            for idx in line_cells[line]:
+                if cells[idx] == 0: threats.add(actions[idx][(need - 1) // 2])
+        return sorted(threats)
+
+
+# Zobrist key toggled in a state's hash whenever it is the odd player's turn
+_ZOBRIST_ODD_TURN = 0x9E3779B97F4A7C15
@@ -0,0 +1,226 @@
+"""
+Persistent store of solved T3 positions, shared by every process that opens the
+same file and kept across restarts: an SQLite database in WAL mode (so readers
+never block, nor are blocked by, the one writer at a time) mapping canonical keys
+to their exact value, terminal depth and choose's best actions. The T3Player
+consults it (see t3_player.STORE_PATH) before searching, and writes the positions
+it solves back in batches.
+"""
+from dataclasses import *
+from typing import *
+from t3_state import *
+import atexit
+import multiprocessing.util
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+"Valeria Sanz Jones"
+
+# Version of the database layout, bumped whenever the schema or encoding changes
+VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS solved (
+    key BLOB PRIMARY KEY,
+    value INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    best BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+@dataclass
+class Solved:
+    """
+    A solved position, as seen from the state it was looked up for.
+    """
+    
+    # The exact minimax value (evens maximizing, as alphabeta's)
+    value: int
+    # Plies from the position to the terminal behind the value
+    depth: int
+    # choose's answer in the position
+    action: "T3Action"
+
+class SolvedStore:
+    """
+    A connection to a solved-position store. Each entry keeps, in the frame of the
+    position's canonical_key, the set of its best actions under choose's tiebreak
+    but for the last (T3Action order) criterion, which is closed under the
+    position's own symmetries; mapped into any orientation of the position, its
+    earliest action is choose's answer there. Writes are buffered, and committed
+    in one transaction once batch of them are pending or interval seconds passed
+    since the last commit (and on flush / close).
+    
+    Safe to share between threads; a process that inherits an open store (e.g.,
+    through fork) reconnects on its first use.
+    """
+    
+    def __init__(self, path: str, batch: int = 64, interval: float = 5.0):
+        """
+        Opens (creating, if need be) the store at the given path.
+        
+        Parameters:
+            path (str):
+                The database file
+            batch (int):
+                Pending writes that trigger a commit
+            interval (float):
+                Seconds after which pending writes are committed on the next one
+        
+        [!] Raises a ValueError if the file is a store of another VERSION
+        """
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending: list[tuple[bytes, int, int, bytes]] = []
+        self._flushed = time.monotonic()
+        self._pid = -1
+        self._db: Optional[sqlite3.Connection] = None
+        self._connect()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Returns:
+            sqlite3.Connection:
+                This process's connection, opened on first use in the process
+        """
+        if self._db is not None and self._pid == os.getpid(): return self._db
+        # A connection inherited from a parent process must not be used (nor closed)
+        self._db, self._pending, self._pid = None, [], os.getpid()
+        db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        db.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", (VERSION,))
+        version = db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()[0]
+        if version != VERSION:
+            db.close()
+            raise ValueError("[X] " + self.path + " is a version " + str(version) + " store, not " + str(VERSION))
+        self._db = db
+        return db
+    
+    def lookup(self, state: "T3State") -> Optional[Solved]:
+        """
+        Parameters:
+            state (T3State):
+                A non-terminal state
+        
+        Returns:
+            Optional[Solved]:
+                The state's solution, or None if it was never stored
+        """
+        key, perm = _key(state)
+        with self._lock:
+            row = self._connect().execute("SELECT value, depth, best FROM solved WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        value, depth, best = row
+        actions = []
+        for code in struct.unpack("<" + str(len(best) // 2) + "H", best):
+            idx = perm[code >> 8]
+            actions.append(state._rules.action(idx, code & 0xFF))
+        return Solved(value, depth, min(actions))
+    
+    def put(self, state: "T3State", value: int, depth: int, best: list["T3Action"]) -> None:
+        """
+        Stores a solved position (a position stored already is left as it is).
+        
+        Parameters:
+            state (T3State):
+                The solved, non-terminal state
+            value (int):
+                Its exact minimax value, evens maximizing
+            depth (int):
+                Plies to the terminal behind the value
+            best (list[T3Action]):
+                Every action (in state's frame) achieving the value at that depth
+        """
+        key, perm = _key(state)
+        inverse = [0] * len(perm)
+        for i, j in enumerate(perm): inverse[j] = i
+        n = state._cols
+        codes = sorted(inverse[a.row() * n + a.col()] << 8 | a.move() for a in best)
+        with self._lock:
+            self._connect()
+            self._pending.append((key, int(value), depth, struct.pack("<" + str(len(codes)) + "H", *codes)))
+            if len(self._pending) >= self.batch or time.monotonic() - self._flushed >= self.interval:
+                self._commit()
+    
+    def flush(self) -> None:
+        """
+        Commits the pending writes.
+        """
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid(): self._commit()
+    
+    def _commit(self) -> None:
+        """
+        Writes the pending entries in one transaction; the caller holds the lock.
+        """
+        self._flushed = time.monotonic()
+        if not self._pending: return
+        db = cast(sqlite3.Connection, self._db)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("INSERT OR IGNORE INTO solved VALUES (?, ?, ?, ?)", self._pending)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._pending = []
+    
+    def close(self) -> None:
+        """
+        Commits the pending writes and closes this process's connection.
+        """
+        self.flush()
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid(): self._db.close()
+            self._db = None
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return cast(int, self._connect().execute("SELECT COUNT(*) FROM solved").fetchone()[0])
+
+def _key(state: "T3State") -> tuple[bytes, tuple[int, ...]]:
+    """
+    Returns:
+        tuple[bytes, tuple[int, ...]]:
+            The store key of a state (its rules and canonical_key), and a
+            symmetry mapping it onto the key's board (image[i] = flat[perm[i]])
+    """
+    board, odd_turn = state.canonical_key()
+    flat = state._cells
+    perm = next(perm for perm in state._rules.symmetries if tuple([flat[i] for i in perm]) == board)
+    rules = state._rules
+    return (struct.pack("<HHh", rules.size, rules.max_move, rules.win_target) + bytes(board) + bytes([odd_turn]), perm)
+
+def open_store(path: str, **options: Any) -> SolvedStore:
+    """
+    Opens a store whose pending writes are also committed when the process exits
+    normally, be it a main process or a multiprocessing worker (which exits
+    without running atexit handlers).
+    
+    Parameters:
+        path (str):
+            The database file
+        options:
+            As in SolvedStore
+    
+    Returns:
+        SolvedStore:
+            The open store
+    """
+    store = SolvedStore(path, **options)
+    atexit.register(store.flush)
+    multiprocessing.util.Finalize(store, store.flush, exitpriority=0)
+    return store
@@ -0,0 +1,299 @@
+"""
+Endgame tablebase for the standard 3x3 game of T3: an offline generator that solves
+every position reachable from the empty board by retrograde analysis, and a reader
+that memory-maps the result so the T3Player can answer with a single lookup.
+"""
+from typing import *
+from t3_state import *
+import functools
+import mmap
+import os
+import struct
+import sys
+import time
+
+"Valeria Sanz Jones"
+
+# Where the T3Player looks for the tablebase unless told otherwise
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "t3_tablebase.bin")
+# Version of the on-disk format, bumped whenever the ranking or encoding changes
+VERSION = 2
+# Entry byte of positions without a stored action (terminals, uncovered boards)
+NO_ENTRY = 0xFF
+
+# File header: magic, format version, board size, MAX_MOVE, WIN_TARGET
+_HEADER = struct.Struct("<4sBBBB")
+_MAGIC = b"T3TB"
+
+Key = tuple[tuple[int, ...], bool]
+
+class Tablebase:
+    """
+    Read-only, memory-mapped view of a generated tablebase file. Every covered
+    position maps (through rank) to one byte holding the best action under the
+    T3Player's tiebreaking order, encoded as flat_index * MAX_MOVE + move - 1.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Opens and validates the tablebase at the given path.
+        
+        Parameters:
+            path (str):
+                The file written by generate
+        
+        [!] Raises a ValueError if the file is not a tablebase of this VERSION
+        """
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, max_move, win_target = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != VERSION:
+            raise ValueError("[X] " + path + " is not a version " + str(VERSION) + " T3 tablebase")
+        self._size: int = size
+        self._max_move: int = max_move
+        self._win_target: int = win_target
+    
+    def lookup(self, state: "T3State") -> Optional["T3Action"]:
+        """
+        Returns the stored best action of the given state, if the tablebase was
+        generated for the current rules and covers it.
+        
+        Parameters:
+            state (T3State):
+                The (non-terminal) state a move is wanted for
+        
+        Returns:
+            Optional[T3Action]:
+                The best action, or None if the state is not in the tablebase
+        """
+        if state._rules.key() != (self._size, self._max_move, self._win_target): return None
+        index = rank(state._cells, state._odd_turn, self._size, self._max_move)
+        if index < 0: return None
+        code = self._map[_HEADER.size + index]
+        if code == NO_ENTRY: return None
+        return decode(code, self._size, self._max_move)
+    
+    def close(self) -> None:
+        self._map.close()
+
+@functools.lru_cache(maxsize=None)
+def _slot_offsets(size: int, max_move: int) -> tuple[tuple[int, ...], int]:
+    """
+    Computes the perfect ranking's offset table. Each cell of a board is one of
+    3 kinds (empty, odd, even), and a pattern of kinds together with the turn is
+    a slot when it is not full and its odd / even counts can follow alternating
+    play from either starting player; each slot then holds one entry per way of
+    choosing the number on each filled tile (from the odd player's numbers on odd
+    tiles and the even player's on even ones, which differ in count when max_move
+    is odd).
+    
+    Parameters:
+        size (int):
+            The side length of the square board
+        max_move (int):
+            The largest number either player may place
+    
+    Returns:
+        tuple[tuple[int, ...], int]:
+            The offset of every pattern * 2 + odd_turn slot (-1 if invalid), and
+            the total number of ranked positions
+    """
+    cells, odd_base, even_base = size * size, (max_move + 1) // 2, max_move // 2
+    offsets = [-1] * (3 ** cells * 2)
+    total = 0
+    for pattern in range(3 ** cells):
+        odd = even = 0
+        p = pattern
+        for _ in range(cells):
+            odd += p % 3 == 1
+            even += p % 3 == 2
+            p //= 3
+        if odd + even == cells: continue
+        for odd_turn in (False, True):
+            diff = odd - even
+            if diff == 0 or (diff == 1 and not odd_turn) or (diff == -1 and odd_turn):
+                offsets[pattern * 2 + odd_turn] = total
+                total += odd_base ** odd * even_base ** even
+    return (tuple(offsets), total)
+
+def rank(cells: Sequence[int], odd_turn: bool, size: int, max_move: int) -> int:
+    """
+    Perfect ranking of non-full boards whose tile counts are consistent with the
+    turn: distinct positions get distinct indices in [0, total).
+    
+    Parameters:
+        cells (Sequence[int]):
+            The board, flattened row-major
+        odd_turn (bool):
+            Whether it is the odd player's turn
+        size (int):
+            The side length of the square board
+        max_move (int):
+            The largest number either player may place
+    
+    Returns:
+        int:
+            The position's index, or -1 if it has no slot in the ranking
+    """
+    offsets, _ = _slot_offsets(size, max_move)
+    bases = ((max_move + 1) // 2, max_move // 2)
+    pattern = digits = 0
+    pattern_scale = digit_scale = 1
+    for cell in cells:
+        if cell:
+            if cell < 0 or cell > max_move: return -1
+            pattern += (2 - cell % 2) * pattern_scale
+            # Mixed radix: odd tiles have (max_move + 1) // 2 numbers, even ones max_move // 2
+            digits += (cell - 1) // 2 * digit_scale
+            digit_scale *= bases[1 - cell % 2]
+        pattern_scale *= 3
+    offset = offsets[pattern * 2 + odd_turn]
+    return -1 if offset < 0 else offset + digits
+
+def encode(act: "T3Action", size: int, max_move: int) -> int:
+    """
+    Parameters:
+        act (T3Action):
+            The action to store
+        size (int):
+            The side length of the square board
+        max_move (int):
+            The largest number either player may place
+    
+    Returns:
+        int:
+            The entry byte of the action
+    """
+    return (act.row() * size + act.col()) * max_move + act.move() - 1
+
+def decode(code: int, size: int, max_move: int) -> "T3Action":
+    """
+    Parameters:
+        code (int):
+            An entry byte written by encode
+        size (int):
+            The side length of the square board
+        max_move (int):
+            The largest number either player may place
+    
+    Returns:
+        T3Action:
+            The action the byte represents
+    """
+    idx, move = divmod(code, max_move)
+    return T3Action(idx % size, idx // size, move + 1)
+
+def _state_of(key: Key, rules: "T3Rules") -> "T3State":
+    """
+    Rebuilds the (canonical) state that a canonical_key was taken from.
+    """
+    cells, odd_turn = key
+    size = rules.size
+    return T3State(odd_turn, [list(cells[r * size:(r + 1) * size]) for r in range(size)], rules)
+
+def generate(path: str, roots: Optional[list["T3State"]] = None, verbose: bool = False) -> int:
+    """
+    Solves every non-terminal position reachable from the given roots and writes
+    the tablebase file. Positions are gathered forward, one layer per number of
+    filled tiles, merging rotations / reflections into their canonical_key; layers
+    are then solved in reverse (retrograde) order, from the full board back to the
+    roots, each from the already-solved layer after it. The best action of every
+    orientation of a canonical position is picked from the position's optimal set
+    so that the tiebreaking order (utility, depth, T3Action) holds in that frame.
+    
+    Parameters:
+        path (str):
+            Where to write the tablebase
+        roots (Optional[list[T3State]]):
+            The positions whose subtrees are covered; by default the empty
+            DEFAULT_SIZE board with either player starting
+        verbose (bool):
+            Whether to print progress to stderr
+    
+    Returns:
+        int:
+            The number of positions written
+    """
+    if not roots:
+        roots = [T3State(True, None), T3State(False, None)]
+    rules = roots[0]._rules
+    size, max_move = rules.size, rules.max_move
+    if size * size * max_move >= NO_ENTRY:
+        raise ValueError("[X] Board of size " + str(size) + " does not fit one-byte entries")
+    _, total = _slot_offsets(size, max_move)
+    start = time.monotonic()
+    
+    # Forward: the canonical non-terminal positions of each layer
+    cells = size * size
+    layers: list[set[Key]] = [set() for _ in range(cells + 1)]
+    for root in roots:
+        if not root.is_win() and not root.is_tie():
+            layers[cells - root._open].add(root.canonical_key())
+    for filled in range(cells):
+        for key in layers[filled]:
+            state = _state_of(key, rules)
+            for act in state.get_actions():
+                state.apply(act)
+                if not state.is_win() and not state.is_tie():
+                    layers[filled + 1].add(state.canonical_key())
+                state.undo(act)
+        if verbose:
+            print("[...] layer " + str(filled + 1) + ": " + str(len(layers[filled + 1])) + " positions", file=sys.stderr)
+    
+    # Retrograde: values (to the player to move) of the layer after the current one
+    entries = bytearray([NO_ENTRY]) * total
+    perms = [(perm, _inverse(perm)) for perm in rules.symmetries]
+    written = 0
+    solved: dict[Key, int] = {}
+    for filled in range(cells, -1, -1):
+        values: dict[Key, int] = {}
+        for key in layers[filled]:
+            state = _state_of(key, rules)
+            best, optimal = -NO_ENTRY, []
+            for act in state.get_actions():
+                state.apply(act)
+                if state.is_win(): value = state._open + 1
+                elif state.is_tie(): value = 0
+                else: value = -solved[state.canonical_key()]
+                state.undo(act)
+                if value > best: best, optimal = value, [act]
+                elif value == best: optimal.append(act)
+            values[key] = best
+            
+            board, odd_turn = key
+            seen = set()
+            for perm, inverse in perms:
+                image = tuple([board[i] for i in perm])
+                if image in seen: continue
+                seen.add(image)
+                moved = [inverse[a.row() * size + a.col()] for a in optimal]
+                act = min(T3Action(i % size, i // size, a.move()) for (i, a) in zip(moved, optimal))
+                entries[rank(image, odd_turn, size, max_move)] = encode(act, size, max_move)
+                written += 1
+        solved = values
+        if filled < cells: layers[filled + 1].clear()
+        if verbose:
+            print("[...] solved layer " + str(filled) + " (" + str(round(time.monotonic() - start)) + "s)", file=sys.stderr)
+    
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, VERSION, size, max_move, rules.win_target))
+        f.write(entries)
+    return written
+
+def _inverse(perm: tuple[int, ...]) -> tuple[int, ...]:
+    """
+    Returns the inverse of a flat index permutation from symmetries, i.e., for
+    image[i] = flat[perm[i]], the image index inverse[j] that flat index j lands on.
+    """
+    inverse = [0] * len(perm)
+    for i, j in enumerate(perm):
+        inverse[j] = i
+    return tuple(inverse)
+
+if __name__ == '__main__':
+    """
+    Generates the standard tablebase: python t3_tablebase.py [PATH]
+    """
+    out = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    count = generate(out, verbose=True)
+    print("[!] Wrote " + str(count) + " positions to " + out)
@@ -1,9 +1,61 @@
 from t3_state import *
 from t3_action import *
 from t3_player import *
+from t3_mcts import *
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import pickle
+import random
+import tempfile
+import threading
+import time
+import t3_bench
+import t3_blunders
+import t3_book
+import t3_player
+import t3_pns
+import t3_server
+import t3_store
+import t3_tablebase
+import t3_tourney
 import unittest
+from unittest import mock
 import pytest
 
+def _minimax(state: T3State) -> int:
+    """
+    Plain minimax utility of a state (evens maximizing), as an oracle for the
+    searches; only feasible with a handful of open tiles.
+    """
+    if state.is_win(): return (state._open + 1) * (1 if state._odd_turn else -1)
+    if state.is_tie(): return 0
+    values = [_minimax(child) for _, child in state.get_transitions()]
+    return min(values) if state._odd_turn else max(values)
+
+def _minimax_choice(state: T3State) -> T3Action:
+    """
+    The move choose must make from a state by the _minimax oracle: the best utility
+    (which accounts for depth), then the earliest in T3Action order.
+    """
+    sign = -1 if state._odd_turn else 1
+    return min(state.get_transitions(), key=lambda t: (-sign * _minimax(t[1]), t[0]))[0]
+
+def _random_position(rng: random.Random, moves: int, size: int = 3, rules: Optional[T3Rules] = None) -> T3State:
+    """
+    A state reached by up to the given number of random moves from an empty board
+    (of the size, or else of the rules), with a random player to start; it stops
+    early at a win.
+    """
+    board = None if rules is not None else [[0] * size for _ in range(size)]
+    state = T3State(rng.random() < 0.5, board, rules)
+    for _ in range(moves):
+        if state.is_win(): break
+        state.apply(rng.choice(list(state.get_actions())))
+    return state
+
 class T3GradingTests(unittest.TestCase):
     """
     Unit tests for validating the t3 agent's efficacy. Notes:
@@ -105,6 +157,78 @@ class T3GradingTests(unittest.TestCase):
         transitions = set(t3state.get_transitions())
         self.assertEqual(15, len(transitions))
     
+    def test_t3_state_apply_undo(self) -> None:
+        state = [
+            [0, 1, 0],
+            [0, 1, 0],
+            [2, 0, 6]
+        ]
+        t3state = T3State(True, state)
+        original = T3State(True, [list(row) for row in state])
+        act = T3Action(2, 1, 3)
+        child = t3state.get_next_state(act)
+        self.assertEqual(original, t3state)
+        t3state.apply(act)
+        self.assertEqual(child, t3state)
+        self.assertEqual(hash(child), hash(t3state))
+        t3state.undo(act)
+        self.assertEqual(original, t3state)
+        self.assertEqual(state, t3state.board())
+    
+    def test_t3_state_incremental_lines(self) -> None:
+        rng = random.Random(3)
+        for size in (3, 4, 5):
+            t3state = T3State(True, [[0] * size for _ in range(size)])
+            played = []
+            while not t3state.is_win() and not t3state.is_tie():
+                act = rng.choice(list(t3state.get_actions()))
+                t3state.apply(act)
+                played.append(act)
+                fresh = T3State(t3state._odd_turn, t3state.board())
+                self.assertEqual(fresh._sums, t3state._sums)
+                self.assertEqual(fresh._fills, t3state._fills)
+                self.assertEqual(fresh.is_win(), t3state.is_win())
+                self.assertEqual(fresh.is_tie(), t3state.is_tie())
+                self.assertEqual(hash(fresh), hash(t3state))
+            for act in reversed(played):
+                t3state.undo(act)
+            self.assertEqual([0] * (2 * size + 2), t3state._sums)
+            self.assertEqual(size * size, t3state._open)
+            self.assertEqual(hash(T3State(True, [[0] * size for _ in range(size)])), hash(t3state))
+    
+    def test_t3_state_rejects_bad_boards(self) -> None:
+        for board in ([[0, 0, 0], [0, 0], [0, 0, 0]], [[0, 0, 0], [0, 7, 0], [0, 0, 0]],
+                      [[0, 0, 0], [0, 200, 0], [0, 0, 0]], [[0, 0, 0], [0, -1, 0], [0, 0, 0]]):
+            with self.assertRaises(ValueError):
+                T3State(True, board)
+        self.assertEqual(8, T3State(True, [[0, 0, 0], [0, 8, 0], [0, 0, 0]], get_rules(3, 8, 15)).board()[1][1])
+    
+    def test_t3_state_threats(self) -> None:
+        state = [
+            [6, 4, 0],
+            [1, 0, 4],
+            [0, 0, 0]
+        ]
+        t3state = T3State(True, state)
+        self.assertEqual([T3Action(2, 0, 3)], t3state.get_threats())
+        self.assertEqual([T3Action(0, 2, 6)], t3state.get_threats(False))
+        self.assertEqual([], T3State(True, None).get_threats())
+    
+    # On 4x4 boards, a line can be won before it is one tile short of full
+    def test_t3_state_threats_partial_lines(self) -> None:
+        state = [
+            [6, 6, 0, 0],
+            [4, 0, 0, 0],
+            [0, 0, 0, 0],
+            [5, 1, 1, 0]
+        ]
+        t3state = T3State(True, state)
+        self.assertEqual([T3Action(2, 0, 1), T3Action(3, 0, 1)], t3state.get_threats())
+        self.assertEqual([T3Action(1, 1, 6), T3Action(1, 2, 6), T3Action(3, 3, 6)], t3state.get_threats(False))
+        # Every even move on a line through the 6 hands the odds a win
+        lone = T3State(False, [[6, 0, 0, 0]] + [[0] * 4 for _ in range(3)])
+        self.assertTrue(all(act.col() and act.row() and act.col() != act.row() for act in candidate_actions(lone)))
+    
     # Tests with small number of transitions (good for just starting testing)
     # ---------------------------------------------------------------------------
     def test_t3_player_small_t0(self) -> None:
@@ -149,6 +273,33 @@ class T3GradingTests(unittest.TestCase):
         action = choose(t3state)
         self.assertEqual(None, action)
     
+    # Every move loses to one of two threats, so the earliest move is chosen
+    def test_t3_player_small_t4(self) -> None:
+        state = [
+            [6, 4, 0],
+            [0, 0, 0],
+            [2, 0, 0]
+        ]
+        t3state = T3State(False, state)
+        action = choose(t3state)
+        self.assertEqual(T3Action(0, 1, 2), action)
+    
+    def test_t3_player_small_4x4_threats(self) -> None:
+        state = [
+            [6, 6, 0, 0],
+            [4, 0, 0, 0],
+            [0, 0, 0, 0],
+            [5, 1, 1, 0]
+        ]
+        with mock.patch.multiple(t3_player, TABLEBASE_PATH=None, BOOK_PATH=None):
+            self.assertEqual(T3Action(2, 0, 1), choose(T3State(True, state), TranspositionTable()))
+            # Late 4x4 positions, where partial lines are often won, against plain minimax
+            rng = random.Random(8)
+            for _ in range(10):
+                t3state = _random_position(rng, 12, 4)
+                if t3state.is_win() or t3state.is_tie(): continue
+                self.assertEqual(_minimax_choice(t3state), choose(t3state, TranspositionTable()))
+    
     # Larger tests with multiple open tiles
     # ---------------------------------------------------------------------------
     def test_t3_player_t0(self) -> None:
@@ -204,6 +355,566 @@ class T3GradingTests(unittest.TestCase):
     # Depth-tricky Cases
     # ---------------------------------------------------------------------------
     
+    # Transposition table
+    # ---------------------------------------------------------------------------
+    def test_t3_state_canonical_key_symmetries(self) -> None:
+        state = [
+            [2, 1, 0],
+            [0, 5, 0],
+            [0, 0, 0]
+        ]
+        rotated = [list(row) for row in zip(*state[::-1])]
+        mirrored = [row[::-1] for row in state]
+        key = T3State(True, state).canonical_key()
+        self.assertEqual(key, T3State(True, rotated).canonical_key())
+        self.assertEqual(key, T3State(True, mirrored).canonical_key())
+        self.assertNotEqual(key, T3State(False, state).canonical_key())
+    
+    def test_t3_player_table_persists(self) -> None:
+        state = T3State(False, [
+            [2, 1, 0],
+            [0, 5, 0],
+            [0, 0, 0]
+        ])
+        table = TranspositionTable()
+        with mock.patch.multiple(t3_player, TABLEBASE_PATH=None, BOOK_PATH=None):
+            self.assertEqual(T3Action(2, 2, 6), choose(state, table))
+            # The odds must block that win, which takes a search
+            blocking = T3State(True, state.board())
+            self.assertEqual(T3Action(2, 2, 1), choose(blocking, table))
+            self.assertGreater(len(table), 0)
+            probes, hits = table.probes, table.hits
+            self.assertEqual(T3Action(2, 2, 1), choose(blocking, table))
+        self.assertEqual(table.probes - probes, table.hits - hits)
+        self.assertGreater(table.hit_rate(), 0)
+    
+    # Iterative deepening
+    # ---------------------------------------------------------------------------
+    def test_t3_player_deadline_matches_full_search(self) -> None:
+        state = T3State(False, [
+            [3, 0, 0],
+            [0, 4, 0],
+            [0, 0, 1]
+        ])
+        action = choose(state, TranspositionTable(), deadline=time.monotonic() + 60)
+        self.assertEqual(T3Action(0, 1, 2), action)
+    
+    def test_t3_player_deadline_bounds_time(self) -> None:
+        state = T3State(True, [[0] * 4 for _ in range(4)])
+        start = time.monotonic()
+        action = choose(state, TranspositionTable(), deadline=start + 0.5)
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertIsNotNone(action)
+        self.assertTrue(state.is_valid_action(cast(T3Action, action)))
+    
+    # Parallel search
+    # ---------------------------------------------------------------------------
+    def test_t3_player_parallel_matches_choose(self) -> None:
+        states = [
+            T3State(True, [[2, 1, 0], [0, 0, 0], [0, 0, 6]]),
+            T3State(False, [[2, 1, 0], [0, 5, 0], [0, 0, 0]]),
+            T3State(False, [[0, 1, 0], [0, 5, 0], [0, 0, 6]]),
+            T3State(True, [[6, 4, 1], [1, 1, 4], [4, 0, 0]]),
+        ]
+        with ParallelSearch(2) as search:
+            for state in states:
+                self.assertEqual(choose(state), search.choose(state))
+            self.assertIsNone(search.choose(T3State(True, [[6, 4, 2], [1, 1, 4], [1, 2, 1]])))
+            variant = T3State(False, [[1, 0, 2], [0, 0, 0], [0, 0, 0]], get_rules(3, 6, 10))
+            self.assertEqual(T3Action(1, 2, 4), search.choose(variant))
+    
+    # Search statistics
+    # ---------------------------------------------------------------------------
+    def test_t3_player_stats(self) -> None:
+        state = T3State(False, [
+            [3, 0, 0],
+            [0, 4, 0],
+            [0, 0, 1]
+        ])
+        stats = SearchStats()
+        with mock.patch.multiple(t3_player, TABLEBASE_PATH=None, BOOK_PATH=None):
+            self.assertEqual(T3Action(0, 1, 2), choose(state, TranspositionTable(), stats=stats))
+            self.assertEqual(1, stats.choices)
+            self.assertEqual(6, stats.depth)
+            self.assertGreater(stats.nodes, stats.interior)
+            self.assertGreater(stats.branching_factor(), 1)
+            self.assertGreater(sum(stats.cutoffs.values()), 0)
+            self.assertTrue(all(0 < ply <= 6 for ply in stats.cutoffs))
+            self.assertIn("nodes=" + str(stats.nodes), stats.report())
+            with ParallelSearch(2) as search:
+                parallel = SearchStats()
+                search.choose(state, parallel)
+                self.assertEqual(1, parallel.choices)
+                self.assertGreater(parallel.nodes, 0)
+    
+    # Benchmarks
+    # ---------------------------------------------------------------------------
+    def test_t3_bench_runs_and_compares(self) -> None:
+        cases = [case for case in t3_bench.CORPUS if case.name in ("mid_diagonal", "prim_is_win4")]
+        results = t3_bench.run(cases, repeat=1)
+        self.assertEqual(["mid_diagonal", "prim_is_win4"], [result.name for result in results])
+        self.assertGreater(results[0].nodes, 0)
+        self.assertGreater(results[0].peak_bytes, 0)
+        baseline = {"results": [result.to_json() for result in results]}
+        self.assertEqual([], t3_bench.compare(results, baseline, 0.25))
+        baseline["results"][0]["nodes"] = results[0].nodes // 2
+        self.assertEqual(1, len(t3_bench.compare(results, baseline, 0.25)))
+    
+    # Monte Carlo Tree Search
+    # ---------------------------------------------------------------------------
+    def test_t3_mcts_legal_and_tactical(self) -> None:
+        tree = MCTSTree(seed=1)
+        state = T3State(True, [[0] * 4 for _ in range(4)])
+        action = tree.choose(state, iterations=300)
+        self.assertTrue(state.is_valid_action(cast(T3Action, action)))
+        self.assertEqual(300, tree.root_visits())
+        winning = T3State(True, [[6, 4, 0], [1, 0, 4], [0, 0, 0]])
+        self.assertEqual(T3Action(2, 0, 3), choose_mcts(winning, iterations=10, tree=MCTSTree(seed=1)))
+        self.assertIsNone(choose_mcts(T3State(True, [[6, 4, 2], [1, 1, 4], [1, 2, 1]]), tree=tree))
+    
+    def test_t3_mcts_reuses_tree(self) -> None:
+        tree = MCTSTree(seed=2)
+        state = T3State(True, [[0] * 4 for _ in range(4)])
+        action = cast(T3Action, tree.choose(state, iterations=500))
+        after = state.get_next_state(action)
+        reply = cast(T3Action, tree.choose(after, iterations=200))
+        self.assertGreater(tree.root_visits(), 200)
+        tree.choose(after.get_next_state(reply), iterations=5)
+        self.assertGreater(tree.root_visits(), 5)
+        tree.reset()
+        self.assertEqual(0, tree.root_visits())
+    
+    # Tablebase
+    # ---------------------------------------------------------------------------
+    def test_t3_tablebase_rank_is_perfect(self) -> None:
+        rng = random.Random(5)
+        # With an odd max_move, the odd player has one number more than the even one
+        for rules in (get_rules(3, T3State.MAX_MOVE, T3State.WIN_TARGET), get_rules(3, 5, 11)):
+            _, total = t3_tablebase._slot_offsets(3, rules.max_move)
+            ranks: dict[int, T3State] = {}
+            for _ in range(300):
+                t3state = _random_position(rng, rng.randrange(9), rules=rules)
+                index = t3_tablebase.rank(t3state._cells, t3state._odd_turn, 3, rules.max_move)
+                self.assertTrue(0 <= index < total)
+                self.assertEqual(ranks.setdefault(index, t3state), t3state)
+        full = T3State(True, [[6, 4, 2], [1, 1, 4], [1, 2, 1]])
+        self.assertEqual(-1, t3_tablebase.rank(full._cells, full._odd_turn, 3, T3State.MAX_MOVE))
+    
+    def test_t3_tablebase_matches_search(self) -> None:
+        roots = [
+            T3State(True, [[2, 1, 0], [0, 3, 0], [0, 4, 6]]),
+            T3State(False, [[3, 0, 0], [0, 4, 0], [2, 0, 1]]),
+        ]
+        variant = [T3State(True, [[2, 0, 5], [0, 0, 0], [0, 1, 2]], get_rules(3, 5, 11))]
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(t3_player, "TABLEBASE_PATH", None):
+            for i, tb_roots in enumerate((roots, variant)):
+                path = os.path.join(tmp, "tb" + str(i) + ".bin")
+                self.assertGreater(t3_tablebase.generate(path, tb_roots), 0)
+                tablebase = t3_tablebase.Tablebase(path)
+                self.assertIsNone(tablebase.lookup(T3State(True, None, tb_roots[0].rules())))
+                for root in tb_roots:
+                    self.assertEqual(choose(root, TranspositionTable()), tablebase.lookup(root))
+                    for act, child in root.get_transitions():
+                        if child.is_win() or child.is_tie(): continue
+                        self.assertEqual(choose(child, TranspositionTable()), tablebase.lookup(child))
+                tablebase.close()
+    
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "requires numpy")
+    def test_t3_batch_matches_state(self) -> None:
+        import t3_batch
+        rng = random.Random(12)
+        states = []
+        for size in (3, 3, 3, 4):
+            for _ in range(60):
+                board = [[rng.choice([0, 0, 0, 1, 2, 3, 4, 5, 6]) for _ in range(size)] for _ in range(size)]
+                states.append(T3State(rng.random() < 0.5, board))
+            boards, odd_turns = t3_batch.to_array(states[-60:])
+            wins, ties = t3_batch.is_win(boards), t3_batch.is_tie(boards)
+            children, child_turns, parents, actions = t3_batch.successors(boards, odd_turns)
+            expected = []
+            for i, t3state in enumerate(states[-60:]):
+                self.assertEqual(t3state.is_win(), wins[i])
+                self.assertEqual(t3state.is_tie(), ties[i])
+                expected += [(i, act, child) for act, child in t3state.get_transitions()]
+            got = t3_batch.from_array(children, child_turns)
+            self.assertEqual(expected, [(parents[k], T3Action(*actions[k].tolist()), got[k]) for k in range(len(got))])
+    
+    def test_t3_tourney_runs(self) -> None:
+        specs = t3_tourney.schedule(8, "alphabeta", "random", [[[0] * 3 for _ in range(3)]], [True, False],
+                                    swap=True, random_plies=3, seed=4)
+        self.assertEqual(["alphabeta", "alphabeta", "random", "random"] * 2, [spec.odd_engine for spec in specs])
+        inline, pooled = io.StringIO(), io.StringIO()
+        summary = t3_tourney.run(specs, 1, inline)
+        self.assertEqual(8, summary.games)
+        self.assertEqual(8, summary.odd_wins + summary.even_wins + summary.ties)
+        self.assertEqual(0, summary.engine_wins.get("random", 0))
+        self.assertIn("games/s", summary.report())
+        t3_tourney.run(specs, 2, pooled)
+        outcomes = [[(line["i"], line["w"], line["plies"]) for line in map(json.loads, log.getvalue().splitlines())]
+                    for log in (inline, pooled)]
+        self.assertEqual(outcomes[0], outcomes[1])
+        self.assertEqual(3.0, t3_tourney.percentile([4.0, 1.0, 3.0, 2.0], 75))
+    
+    def test_t3_server_sessions(self) -> None:
+        board = [[0, 1, 0], [2, 0, 0], [0, 0, 0]]
+        def slow(seconds: float) -> Callable[..., tuple[int, int, int]]:
+            def search(*args: Any) -> tuple[int, int, int]:
+                time.sleep(seconds)
+                return (0, 0, 1)
+            return search
+        
+        async def request(port: int, *lines: dict[str, Any]) -> list[dict[str, Any]]:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            replies = []
+            for line in lines:
+                writer.write((json.dumps(line) + "\n").encode())
+                replies.append(json.loads(await reader.readline()))
+            writer.close()
+            return replies
+        
+        async def scenario() -> None:
+            server = t3_server.T3Server(workers=1, think_time=None, timeout=0.4, max_queue=0, processes=False)
+            port = await server.start(port=0)
+            try:
+                new, state, bad = await request(port, {"op": "new", "board": board, "player_odds": False},
+                                                {"op": "state", "session": 1},
+                                                {"op": "move", "session": 1, "col": 1, "row": 1, "move": 1})
+                self.assertTrue(new["ok"])
+                self.assertEqual(choose(T3State(True, board)), T3Action(*new["ai"]))
+                self.assertEqual("even", state["turn"])
+                self.assertEqual({"ok": False, "error": "invalid action"}, bad)
+                # Malformed boards are turned away, and the connection keeps serving
+                malformed = await request(port, {"op": "new", "board": [[0, 0, 0], [0, 0], [0, 0, 0]]},
+                                          {"op": "new", "board": [[0, 0, 0], [0, 7, 0], [0, 0, 0]]},
+                                          {"op": "new", "board": [[0, 0, 0], [0, 200, 0], [0, 0, 0]]},
+                                          {"op": "state", "session": 1})
+                self.assertEqual(["board must be a square grid"] + 2 * ["board cells must be integers from 0 to 6"],
+                                 [reply["error"] for reply in malformed[:3]])
+                self.assertTrue(malformed[3]["ok"])
+                with mock.patch.object(t3_server, "_ai_move", slow(0.5)):
+                    timed_out, = await request(port, {"op": "new", "board": board, "player_odds": False})
+                self.assertEqual(("timeout", "odd"), (timed_out["error"], timed_out["turn"]))
+                with mock.patch.object(t3_server, "_ai_move", slow(0.1)):
+                    first, second = await asyncio.gather(*[request(port, {"op": "ai", "session": timed_out["session"]}),
+                                                           request(port, {"op": "new", "odds_starts": False, "player_odds": True})])
+                self.assertEqual(([0, 0, 1], "busy"), (first[0]["ai"], second[0]["error"]))
+                # A failed search is an error reply too, and frees its slot
+                with mock.patch.object(t3_server, "_ai_move", mock.Mock(side_effect=RuntimeError)):
+                    failed, after = await request(port, {"op": "new", "board": board, "player_odds": False},
+                                                  {"op": "state", "session": 1})
+                self.assertEqual(("search failed: RuntimeError", "odd"), (failed["error"], failed["turn"]))
+                self.assertTrue(after["ok"])
+                with mock.patch.object(t3_server, "_ai_move", slow(0)):
+                    played, = await request(port, {"op": "ai", "session": failed["session"]})
+                self.assertEqual([0, 0, 1], played["ai"])
+            finally:
+                await server.close()
+        
+        asyncio.run(scenario())
+    
+    def test_t3_ponder_matches_choose(self) -> None:
+        state = T3State(False, [[0, 1, 0], [2, 0, 0], [0, 3, 0]])
+        with mock.patch.object(t3_player, "TABLEBASE_PATH", None):
+            ponderer = Ponderer(TranspositionTable())
+            ponderer.start(state)
+            cast(Any, ponderer._thread).join(10)
+            for act, child in state.get_transitions():
+                if child.is_win() or child.is_tie(): continue
+                self.assertEqual(choose(child, TranspositionTable()), ponderer.answer(child))
+            self.assertIsNone(ponderer.answer(T3State(True, None)))
+            ponderer.start(T3State(True, [[0] * 4 for _ in range(4)]))
+            start = time.monotonic()
+            ponderer.stop()
+            self.assertLess(time.monotonic() - start, 1)
+    
+    def test_t3_book_matches_search(self) -> None:
+        root = T3State(True, [[0, 2, 0], [0, 0, 0], [1, 0, 0]])
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(t3_player, TABLEBASE_PATH=None, BOOK_PATH=None):
+            exact, shallow = os.path.join(tmp, "exact.bin"), os.path.join(tmp, "shallow.bin")
+            self.assertGreater(t3_book.generate(exact, [root], 2), 0)
+            book, table = t3_book.OpeningBook(exact), TranspositionTable()
+            self.assertTrue(book.exact())
+            self.assertIsNone(book.lookup(T3State(True, None)))
+            for act, child in [(None, root)] + list(root.get_transitions()):
+                if child.is_win() or child.is_tie() or child.get_threats(): continue
+                for perm in symmetries(3):
+                    flat = [child._cells[i] for i in perm]
+                    image = T3State(child._odd_turn, [flat[r * 3:r * 3 + 3] for r in range(3)])
+                    self.assertEqual(choose(image, table), book.lookup(image))
+            t3_book.generate(shallow, [root], 1, depth=1)
+            with self.assertRaises(ValueError):
+                t3_book.generate(shallow, [root], 1, depth=0)
+            self.assertFalse(t3_book.OpeningBook(shallow).exact())
+            with mock.patch.object(t3_player, "BOOK_PATH", shallow):
+                self.assertEqual(choose(root, TranspositionTable()), t3_book.OpeningBook(exact).lookup(root))
+                self.assertEqual(t3_book.OpeningBook(shallow).lookup(root), choose(root, deadline=time.monotonic()))
+    
+    def test_t3_pvs_matches_minimax(self) -> None:
+        rng = random.Random(17)
+        with mock.patch.object(t3_player, "TABLEBASE_PATH", None):
+            for _ in range(30):
+                t3state = _random_position(rng, 5)
+                if t3state.is_win(): continue
+                self.assertEqual(_minimax_choice(t3state), choose(t3state, TranspositionTable()))
+    
+    def test_t3_analyze_scores_every_move(self) -> None:
+        rng = random.Random(18)
+        with mock.patch.object(t3_player, "TABLEBASE_PATH", None):
+            for _ in range(10):
+                t3state = _random_position(rng, 3)
+                lines = analyze(t3state, table=TranspositionTable())
+                self.assertEqual(len(list(t3state.get_actions())), len(lines))
+                self.assertEqual(choose(t3state, TranspositionTable()), lines[0].action)
+                self.assertEqual(lines[:3], analyze(t3state, 3, TranspositionTable()))
+                for line in lines:
+                    end = t3state.copy()
+                    for act in line.pv:
+                        self.assertTrue(end.is_valid_action(act))
+                        end.apply(act)
+                    self.assertTrue(end.is_win() or end.is_tie())
+                    self.assertEqual(line.depth, len(line.pv))
+                    self.assertEqual(abs(line.utility), end._open + 1 if end.is_win() else 0)
+                    self.assertEqual(line.utility > 0, end.is_win() and len(line.pv) % 2 == 1)
+            self.assertEqual([], analyze(T3State(True, [[6, 4, 2], [1, 1, 4], [1, 2, 1]])))
+    
+    def test_t3_blunders_report_and_resume(self) -> None:
+        rng = random.Random(19)
+        games: list[dict[str, Any]] = []
+        start = [[0, 1, 0], [2, 0, 0], [0, 0, 0]]
+        for i in range(24):
+            t3state, moves = T3State(i % 2 == 0, start), []
+            while not t3state.is_win() and not t3state.is_tie():
+                act = rng.choice(list(t3state.get_actions()))
+                moves.append([act.col(), act.row(), act.move()])
+                t3state.apply(act)
+            games.append({"id": i, "board": start, "odds_starts": i % 2 == 0, "moves": moves})
+        with tempfile.TemporaryDirectory() as tmp:
+            source, out = os.path.join(tmp, "games.jsonl"), os.path.join(tmp, "report.jsonl")
+            with open(source, "w") as f:
+                for game in games: f.write(json.dumps(game) + "\n")
+                f.write("not json\n" + json.dumps([[0, 0, 2]]) + "\n")
+                f.write(json.dumps({"board": [[0, 0, 0], [0, 200, 0], [0, 0, 0]], "moves": []}) + "\n")
+            self.assertEqual(27, t3_blunders.analyze_games(source, out, workers=1, chunk=5))
+            with open(out) as f:
+                report = f.read()
+            lines = [json.loads(line) for line in report.splitlines()]
+            self.assertEqual([{"game": 24, "error": "unreadable line"}, {"game": 25, "error": "illegal move [0, 0, 2] at ply 0"}], lines[24:26])
+            self.assertEqual(26, lines[26]["game"])
+            self.assertIn("outside 0 to 6", lines[26]["error"])
+            table = TranspositionTable()
+            for game, line in zip(games[:2], lines):
+                t3state, blunders = T3State(game["odds_starts"], start), []
+                for ply, move in enumerate(game["moves"]):
+                    scores = {m.action: m.utility for m in analyze(t3state, table=table)}
+                    best, played = max(scores.values()), scores[T3Action(*move)]
+                    if played < best: blunders.append({"ply": ply, "move": move, "utility": played, "best": best})
+                    t3state.apply(T3Action(*move))
+                self.assertEqual(blunders, line["blunders"])
+            # Resume from the checkpoint after the second chunk, over a half-written line
+            head = "".join(report.splitlines(keepends=True)[:10])
+            with open(out, "w") as f:
+                f.write(head + report[len(head):len(head) + 7])
+            with open(out + ".ckpt", "w") as f:
+                json.dump({"lines": 10, "offset": len(head)}, f)
+            self.assertEqual(17, t3_blunders.analyze_games(source, out, workers=2, chunk=5))
+            with open(out) as f:
+                self.assertEqual(report, f.read())
+    
+    def test_t3_bounded_table(self) -> None:
+        table = BoundedTable(2 * BoundedTable.ENTRY_BYTES)
+        self.assertEqual((2, 2 * BoundedTable.ENTRY_BYTES), (table.capacity, table.nbytes()))
+        with self.assertRaises(ValueError):
+            BoundedTable(BoundedTable.ENTRY_BYTES)
+        a, b, c = (((1,), False, (1, 6, 13)), ((2,), False, (1, 6, 13)), ((3,), False, (1, 6, 13)))
+        table.store(a, 1.0, EXACT, 3, 5)
+        table.store(b, 2.0, LOWER, 1, 2)
+        table.store(b, 0.0, UPPER, 1, 1)
+        self.assertEqual(TTEntry(2.0, LOWER, 1, 2), table.probe(b))
+        table.store(c, 3.0, EXACT, 1, 1)
+        self.assertEqual((TTEntry(1.0, EXACT, 3, 5), None), (table.probe(a), table.probe(b)))
+        table.store(b, 2.0, EXACT, 6, 6)
+        self.assertEqual((TTEntry(1.0, EXACT, 3, 5), None), (table.probe(a), table.probe(c)))
+        self.assertEqual((2, 1.0, 2, 2), (len(table), table.fill(), table.evictions, table.collisions))
+        rng = random.Random(20)
+        with mock.patch.object(t3_player, "TABLEBASE_PATH", None):
+            small, searched = BoundedTable(512), 0
+            while searched < 8:
+                t3state = _random_position(rng, 8, 4)
+                if t3state.is_win() or t3state.get_threats(): continue
+                searched += 1
+                self.assertEqual(choose(t3state, TranspositionTable()), choose(t3state, small))
+            self.assertLessEqual(small.nbytes(), 512)
+            self.assertGreater(small.evictions, 0)
+    
+    def test_t3_pns(self) -> None:
+        rng = random.Random(21)
+        table = TranspositionTable()
+        outcomes = set()
+        for _ in range(60):
+            t3state = _random_position(rng, rng.randint(1, 5))
+            if t3state.is_win() or t3state.is_tie(): continue
+            value = alphabeta(t3state.copy(), float("-inf"), float("inf"), not t3state._odd_turn, table)
+            value = -value if t3state._odd_turn else value
+            proof = cast(t3_pns.Proof, t3_pns.PNSolver(t3state).solve())
+            self.assertEqual("win" if value > 0 else "loss" if value < 0 else "draw", proof.outcome)
+            outcomes.add(proof.outcome)
+            if proof.move is not None:
+                t3state.apply(proof.move)
+                after = alphabeta(t3state, float("-inf"), float("inf"), not t3state._odd_turn, table)
+                after = after if t3state._odd_turn else -after
+                self.assertEqual((value > 0, value >= 0), (after > 0, after >= 0))
+        self.assertEqual({"win", "loss", "draw"}, outcomes)
+        # On 4x4 boards, lines can be won with two tiles still open
+        t3state = T3State(True, [[6, 6, 0, 0], [4, 0, 0, 0], [0, 0, 0, 0], [5, 1, 1, 0]])
+        proof = cast(t3_pns.Proof, t3_pns.PNSolver(t3state).solve())
+        self.assertEqual(("win", T3Action(2, 0, 1)), (proof.outcome, proof.move))
+        proof = cast(t3_pns.Proof, t3_pns.PNSolver(T3State(False, [[0] * 4 for _ in range(4)])).solve())
+        self.assertEqual(("win", T3Action(0, 0, 6)), (proof.outcome, proof.move))
+        # A bounded solver resumed from its checkpoint proves the same, and what it
+        # exports leaves alphabeta's values unchanged
+        empty = T3State(True, [[0] * 3 for _ in range(3)])
+        solver = t3_pns.PNSolver(empty, capacity=200)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pns.bin")
+            self.assertIsNone(solver.solve(max_nodes=300, checkpoint=path, every=100))
+            solver = t3_pns.PNSolver.load(path, capacity=200)
+            self.assertEqual(300, solver.nodes)
+            proof = cast(t3_pns.Proof, solver.solve(max_nodes=20000))
+        self.assertEqual(("loss", None), (proof.outcome, proof.move))
+        self.assertLessEqual(max(len(t) for t in solver._tables), 200)
+        proven = TranspositionTable()
+        self.assertGreater(solver.export(proven), 0)
+        for t3state in [empty] + [empty.get_next_state(act) for act in candidate_actions(empty)]:
+            exact = alphabeta(t3state.copy(), float("-inf"), float("inf"), not t3state._odd_turn, table)
+            self.assertEqual(exact, alphabeta(t3state.copy(), float("-inf"), float("inf"), not t3state._odd_turn, proven))
+    
+    def test_t3_rules(self) -> None:
+        rules = get_rules(3, 4, 9)
+        self.assertIs(rules, get_rules(3, 4, 9))
+        self.assertIs(rules, pickle.loads(pickle.dumps(rules)))
+        self.assertEqual(((1, 3), (2, 4)), (rules.moves(True), rules.moves(False)))
+        self.assertEqual((0, 0, 0, 0, 0, 0, 3, 0, 1), rules.completions[True][:9])
+        # A variant and the default rules side by side, on the same board
+        board = [[4, 2, 0], [1, 0, 0], [0, 0, 0]]
+        variant, default = T3State(True, board, rules), T3State(True, board)
+        self.assertEqual((get_rules(3, 6, 13), [1, 3]), (default.rules(), variant.get_moves()))
+        self.assertEqual([T3Action(2, 0, 3)], variant.get_threats())
+        self.assertEqual([T3Action(0, 2, 4)], variant.get_threats(False))
+        self.assertEqual([], default.get_threats(False))
+        self.assertNotEqual(variant, default)
+        self.assertFalse(variant.is_valid_action(T3Action(0, 0, 1)))
+        self.assertFalse(variant.is_valid_action(T3Action(1, 1, 5)))
+        variant.apply(T3Action(2, 0, 3))
+        self.assertTrue(variant.is_win())
+        self.assertEqual(variant.rules(), variant.copy().rules())
+        with self.assertRaises(ValueError):
+            T3State(True, board, get_rules(4, 6, 13))
+        # Games of both variants may share a transposition table
+        board = [[1, 0, 2], [0, 0, 0], [0, 0, 0]]
+        shared = TranspositionTable()
+        with mock.patch.multiple(t3_player, TABLEBASE_PATH=None, BOOK_PATH=None):
+            self.assertEqual(T3Action(1, 2, 6), choose(T3State(False, board), shared))
+            self.assertEqual(T3Action(1, 2, 4), choose(T3State(False, board, get_rules(3, 6, 10)), shared))
+    
+    def test_t3_action_codes(self) -> None:
+        rng = random.Random(23)
+        acts = [T3Action(rng.randrange(5), rng.randrange(5), rng.randrange(1, 7)) for _ in range(200)]
+        self.assertEqual(sorted(acts, key=lambda a: (a.col(), a.row(), a.move())), sorted(acts))
+        for act in acts:
+            self.assertEqual(act, T3Action.from_code(act.code()))
+            self.assertEqual(hash(act), hash(T3Action(act.col(), act.row(), act.move())))
+        # Actions with fields the codes cannot hold compare by their fields
+        self.assertEqual(-1, T3Action(1, -256, 1).code())
+        self.assertNotEqual(T3Action(1, -256, 1), T3Action(0, 0, 1))
+        self.assertEqual(hash(T3Action(0, -1, 2)), hash(T3Action(0, -1, 2)))
+        self.assertEqual([T3Action(-1, 5, 1), T3Action(0, 300, 1), T3Action(1, 0, 1)],
+                         sorted([T3Action(1, 0, 1), T3Action(0, 300, 1), T3Action(-1, 5, 1)]))
+        # Actions are interned per rules, and children are only built on demand
+        t3state = T3State(False, [[1, 0, 0], [0, 0, 0], [0, 0, 0]])
+        first = list(t3state.get_actions())
+        self.assertTrue(all(a is b for a, b in zip(first, t3state.get_actions())))
+        self.assertIs(first[0], t3state.rules().action(3, 2))
+        with mock.patch.object(T3State, "copy", wraps=t3state.copy) as copies:
+            act, child = next(t3state.get_transitions())
+            self.assertEqual((first[0], 1), (act, copies.call_count))
+        self.assertEqual(t3state.get_next_state(act), child)
+    
+    def test_t3_move_ordering(self) -> None:
+        rng = random.Random(24)
+        ordering, table = MoveOrdering(), TranspositionTable()
+        with mock.patch.object(t3_player, "TABLEBASE_PATH", None), mock.patch.object(t3_player, "BOOK_PATH", None):
+            # A whole game on one table and ordering, as choose keeps them by default
+            for size in (3, 4):
+                t3state = T3State(True, [[0] * size for _ in range(size)])
+                for _ in range(2 * size - 2): t3state.apply(rng.choice(list(t3state.get_actions())))
+                while not t3state.is_win() and not t3state.is_tie():
+                    act = choose(t3state, table, ordering=ordering)
+                    self.assertEqual(t3_player._choose(t3state, TranspositionTable(), None, None), act)
+                    t3state.apply(cast(T3Action, act))
+            self.assertTrue(ordering._history and ordering._killers)
+            fewer = SearchStats()
+            choose(T3State(False, None), TranspositionTable(), stats=fewer, ordering=MoveOrdering())
+            plain = SearchStats()
+            t3_player._choose(T3State(False, None), TranspositionTable(), None, plain)
+        self.assertLess(fewer.nodes, plain.nodes)
+        ordering.clear()
+        self.assertEqual(({}, {}), (ordering._history, ordering._killers))
+    
+    def test_t3_move_ordering_threads(self) -> None:
+        # Searches sharing one ordering age it while the others record cutoffs
+        ordering, errors = MoveOrdering(), list[BaseException]()
+        def search(seed: int) -> None:
+            rng = random.Random(seed)
+            try:
+                for _ in range(8):
+                    t3state = _random_position(rng, 8, 4)
+                    if t3state.is_win(): continue
+                    self.assertEqual(t3_player._choose(t3state, TranspositionTable(), None, None),
+                                     choose(t3state, TranspositionTable(), ordering=ordering))
+            except BaseException as e:
+                errors.append(e)
+        with mock.patch.multiple(t3_player, TABLEBASE_PATH=None, BOOK_PATH=None):
+            threads = [threading.Thread(target=search, args=(seed,)) for seed in range(4)]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+        self.assertEqual([], errors)
+        # ...while each server worker keeps its own
+        orderings = list[MoveOrdering]()
+        thread = threading.Thread(target=lambda: orderings.append(t3_server._worker_ordering()))
+        thread.start()
+        thread.join()
+        self.assertIs(t3_server._worker_ordering(), t3_server._worker_ordering())
+        self.assertIsNot(orderings[0], t3_server._worker_ordering())
+    
+    def test_t3_solved_store(self) -> None:
+        rng = random.Random(25)
+        with tempfile.TemporaryDirectory() as tmp, \
+             mock.patch.multiple(t3_player, TABLEBASE_PATH=None, BOOK_PATH=None, STORE_PATH=os.path.join(tmp, "s.db")):
+            path = os.path.join(tmp, "s.db")
+            solved: list[tuple[T3State, Optional[T3Action]]] = []
+            while len(solved) < 6:
+                t3state = _random_position(rng, 3)
+                if t3state.is_win() or t3state.get_threats(): continue
+                solved.append((t3state, choose(t3state, TranspositionTable())))
+            t3_player._open_store(path).flush()
+            # Another process (or a restart) sees them, in every orientation
+            store = t3_store.SolvedStore(path)
+            self.assertGreater(len(store), 0)
+            for t3state, act in solved:
+                stats = SearchStats()
+                self.assertEqual(act, choose(t3state, TranspositionTable(), stats=stats))
+                self.assertEqual(0, stats.nodes)
+                for perm in symmetries(3):
+                    flat = [t3state._cells[i] for i in perm]
+                    image = T3State(t3state._odd_turn, [flat[r * 3:r * 3 + 3] for r in range(3)])
+                    with mock.patch.object(t3_player, "STORE_PATH", None):
+                        expected = choose(image, TranspositionTable())
+                    self.assertEqual(expected, cast(t3_store.Solved, store.lookup(image)).action)
+            self.assertIsNone(store.lookup(T3State(True, [[0] * 4 for _ in range(4)])))
+            store.close()
+            t3_player._open_store(path).close()
+            t3_player._open_store.cache_clear()
+    
     # [!] VERY IMPORTANT TODO:
     # Make your own test cases to make sure that the depth tiebreaking works as
     # intended -- invent some edge cases to make sure that depth of terminal is
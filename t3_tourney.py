@@ -0,0 +1,297 @@
+"""
+Headless self-play tournament runner for T3: plays many engine-vs-engine games
+across a process pool, streams one compact JSON line per game to a log, and
+summarizes games per second, win / tie rates and per-move latency percentiles.
+
+Usage:
+    python t3_tourney.py [--games 100] [--odd alphabeta] [--even mcts] [--swap]
+                         [--sizes 3 4] [--starts odds|evens|both] [--random-plies 2]
+                         [--think-time 0.1] [--iterations 500] [--workers 4]
+                         [--seed 0] [--log OUT.jsonl]
+"""
+from dataclasses import *
+from typing import *
+from t3_player import *
+from t3_mcts import *
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import random
+import sys
+import t3_game
+import time
+
+"Valeria Sanz Jones"
+
+# The engines a game can pit against each other
+ENGINES = ("alphabeta", "mcts", "random")
+
+@dataclass
+class GameSpec:
+    """
+    Everything a worker needs to play one game.
+    """
+    
+    index: int
+    board: list[list[int]]
+    odds_starts: bool
+    odd_engine: str
+    even_engine: str
+    # Random opening moves played before the engines take over, so that
+    # deterministic engines do not replay the same game every time
+    random_plies: int = 0
+    # Per-move limits: think_time for alphabeta and mcts, iterations for mcts
+    think_time: Optional[float] = None
+    iterations: Optional[int] = None
+    seed: int = 0
+
+@dataclass
+class GameResult:
+    """
+    The outcome of one game.
+    """
+    
+    index: int
+    size: int
+    odd_engine: str
+    even_engine: str
+    # "odd", "even" or "tie"
+    winner: str
+    plies: int
+    # Seconds each engine move took, tagged by whether the odd player made it
+    latencies: list[tuple[bool, float]] = field(default_factory=list)
+    
+    def to_json(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]:
+                The compact log line of the game, with latencies in milliseconds
+                split by player
+        """
+        return {"i": self.index, "n": self.size, "odd": self.odd_engine, "even": self.even_engine,
+                "w": self.winner, "plies": self.plies,
+                "ms_odd": [round(s * 1000, 3) for odd, s in self.latencies if odd],
+                "ms_even": [round(s * 1000, 3) for odd, s in self.latencies if not odd]}
+
+@dataclass
+class Summary:
+    """
+    Aggregate results of a tournament.
+    """
+    
+    games: int = 0
+    seconds: float = 0.0
+    odd_wins: int = 0
+    even_wins: int = 0
+    ties: int = 0
+    # Wins of each engine, whichever side it played
+    engine_wins: dict[str, int] = field(default_factory=dict)
+    # Move latencies of each engine, in seconds
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    
+    def add(self, result: GameResult) -> None:
+        """
+        Counts one finished game.
+        """
+        self.games += 1
+        if result.winner == "odd": self.odd_wins += 1
+        elif result.winner == "even": self.even_wins += 1
+        else: self.ties += 1
+        if result.winner != "tie":
+            engine = result.odd_engine if result.winner == "odd" else result.even_engine
+            self.engine_wins[engine] = self.engine_wins.get(engine, 0) + 1
+        for odd, seconds in result.latencies:
+            self.latencies.setdefault(result.odd_engine if odd else result.even_engine, []).append(seconds)
+    
+    def games_per_second(self) -> float:
+        return self.games / self.seconds if self.seconds else 0.0
+    
+    def report(self) -> str:
+        """
+        Returns:
+            str:
+                A multi-line, human-readable summary
+        """
+        games = self.games or 1
+        lines = [
+            str(self.games) + " games in " + format(self.seconds, ".2f") + "s (" +
+            format(self.games_per_second(), ".1f") + " games/s)",
+            "odd wins " + format(self.odd_wins / games, ".1%") + ", even wins " +
+            format(self.even_wins / games, ".1%") + ", ties " + format(self.ties / games, ".1%"),
+        ]
+        for engine in sorted(self.latencies):
+            times = self.latencies[engine]
+            lines.append("%-10s wins %6.1f%%  moves %7d  p50 %8.2fms  p90 %8.2fms  p99 %8.2fms  max %8.2fms" % (
+                engine, 100 * self.engine_wins.get(engine, 0) / games, len(times),
+                1000 * percentile(times, 50), 1000 * percentile(times, 90),
+                1000 * percentile(times, 99), 1000 * max(times)))
+        return "\n".join(lines)
+
+def percentile(values: list[float], pct: float) -> float:
+    """
+    Parameters:
+        values (list[float]):
+            The samples (not necessarily sorted)
+        pct (float):
+            The percentile wanted, in [0, 100]
+    
+    Returns:
+        float:
+            The nearest-rank percentile of the samples (0 if there are none)
+    """
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(len(ordered) * pct / 100) - 1))]
+
+def _engine_move(engine: str, state: "T3State", spec: GameSpec, tree: MCTSTree,
+                 rng: random.Random) -> Optional["T3Action"]:
+    """
+    Asks the named engine for its move in the given state.
+    """
+    deadline = time.monotonic() + spec.think_time if spec.think_time is not None else None
+    if engine == "alphabeta":
+        return choose(state, deadline=deadline)
+    if engine == "mcts":
+        return tree.choose(state, spec.iterations, deadline)
+    if engine == "random":
+        return rng.choice(list(state.get_actions()))
+    raise ValueError("[X] Unknown engine " + engine)
+
+def play_game(spec: GameSpec) -> GameResult:
+    """
+    Plays one game to its end, timing every engine move.
+    
+    Parameters:
+        spec (GameSpec):
+            The game to play
+    
+    Returns:
+        GameResult:
+            Its outcome
+    """
+    rng = random.Random(spec.seed)
+    state = T3State(spec.odds_starts, [list(row) for row in spec.board])
+    new_game()
+    tree = MCTSTree(spec.seed)
+    result = GameResult(spec.index, state._cols, spec.odd_engine, spec.even_engine, "tie", 0)
+    while not state.is_win() and not state.is_tie():
+        odd = state._odd_turn
+        if result.plies < spec.random_plies:
+            act: Optional[T3Action] = rng.choice(list(state.get_actions()))
+        else:
+            start = time.perf_counter()
+            act = _engine_move(spec.odd_engine if odd else spec.even_engine, state, spec, tree, rng)
+            result.latencies.append((odd, time.perf_counter() - start))
+        state.apply(cast(T3Action, act))
+        result.plies += 1
+    if state.is_win(): result.winner = "even" if state._odd_turn else "odd"
+    return result
+
+def schedule(games: int, odd_engine: str, even_engine: str, boards: Optional[list[list[list[int]]]] = None,
+             starts: Optional[list[bool]] = None, swap: bool = False, random_plies: int = 0,
+             think_time: Optional[float] = None, iterations: Optional[int] = None, seed: int = 0) -> list[GameSpec]:
+    """
+    Builds a tournament's games, cycling through every combination of start board
+    and starting player.
+    
+    Parameters:
+        games (int):
+            The number of games
+        odd_engine, even_engine (str):
+            The ENGINES playing odds and evens
+        boards (Optional[list[list[list[int]]]]):
+            The start boards; by default t3_game.START_STATE
+        starts (Optional[list[bool]]):
+            Whether odds starts, per variant; by default [t3_game.ODDS_STARTS]
+        swap (bool):
+            Whether every other game swaps which engine plays odds
+        random_plies, think_time, iterations, seed:
+            As in GameSpec; each game gets its own seed derived from seed
+    
+    Returns:
+        list[GameSpec]:
+            The games, in order
+    """
+    boards = boards or [t3_game.START_STATE]
+    starts = starts or [t3_game.ODDS_STARTS]
+    variants = [(board, start) for board in boards for start in starts]
+    specs = []
+    for index in range(games):
+        board, start = variants[index % len(variants)]
+        odd, even = (even_engine, odd_engine) if swap and index // len(variants) % 2 else (odd_engine, even_engine)
+        specs.append(GameSpec(index, board, start, odd, even, random_plies, think_time, iterations, seed * 1000003 + index))
+    return specs
+
+def run(specs: list[GameSpec], workers: Optional[int] = None, log: Optional[IO[str]] = None) -> Summary:
+    """
+    Plays the given games, across a process pool unless workers is 1, writing
+    each result to the log as soon as it (and every game before it) is done.
+    
+    Parameters:
+        specs (list[GameSpec]):
+            The games to play
+        workers (Optional[int]):
+            Number of worker processes; defaults to the number of CPUs, and 1
+            plays every game in this process
+        log (Optional[IO[str]]):
+            Where to stream one JSON line per game
+    
+    Returns:
+        Summary:
+            The tournament's aggregate results
+    """
+    summary = Summary()
+    start = time.perf_counter()
+    
+    def record(result: GameResult) -> None:
+        summary.add(result)
+        if log is not None:
+            log.write(json.dumps(result.to_json(), separators=(",", ":")) + "\n")
+    
+    if workers == 1:
+        for spec in specs: record(play_game(spec))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            chunk = max(1, len(specs) // (4 * workers))
+            for result in pool.map(play_game, specs, chunksize=chunk): record(result)
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Command line entry point; returns the process exit status.
+    """
+    parser = argparse.ArgumentParser(description="Play a T3 engine-vs-engine tournament.")
+    parser.add_argument("--games", type=int, default=100, help="number of games (default 100)")
+    parser.add_argument("--odd", choices=ENGINES, default="alphabeta", help="engine playing odds")
+    parser.add_argument("--even", choices=ENGINES, default="alphabeta", help="engine playing evens")
+    parser.add_argument("--swap", action="store_true", help="swap the engines' sides every other round")
+    parser.add_argument("--sizes", type=int, nargs="*", help="play on empty boards of these sizes "
+                        "instead of t3_game.START_STATE")
+    parser.add_argument("--starts", choices=("odds", "evens", "both"), help="who moves first "
+                        "(default t3_game.ODDS_STARTS)")
+    parser.add_argument("--random-plies", type=int, default=0, help="random opening moves per game")
+    parser.add_argument("--think-time", type=float, help="seconds per engine move")
+    parser.add_argument("--iterations", type=int, help="MCTS iterations per move")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPUs; 1 runs inline)")
+    parser.add_argument("--seed", type=int, default=0, help="base random seed")
+    parser.add_argument("--log", help="write one JSON line per game to this file")
+    args = parser.parse_args(argv)
+    
+    boards = [[[0] * size for _ in range(size)] for size in args.sizes] if args.sizes else None
+    starts = {"odds": [True], "evens": [False], "both": [True, False], None: None}[args.starts]
+    specs = schedule(args.games, args.odd, args.even, boards, starts, args.swap, args.random_plies,
+                     args.think_time, args.iterations, args.seed)
+    if args.log:
+        with open(args.log, "w") as log:
+            summary = run(specs, args.workers, log)
+    else:
+        summary = run(specs, args.workers)
+    print(summary.report())
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())